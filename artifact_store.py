@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+from paths import default_cache_dir
+
+STORE_LIMIT = 1024 ** 3  # Bytes kept before the least recently used artifacts go
+HASH_BUFFER = 1024 * 1024
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BUFFER), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ArtifactStore:
+    """Downloaded release archives stored by SHA-256 and found by URL or digest.
+
+    The index maps asset URLs to digests and records when each archive was
+    last used, so the store can stay under its size limit by evicting the
+    least recently used archives first.
+    """
+
+    def __init__(self, root=None, limit=STORE_LIMIT):
+        self.root = root or os.path.join(default_cache_dir(), "artifacts")
+        self.limit = limit
+        self.index_path = os.path.join(self.root, "index.json")
+        self._lock = threading.Lock()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.root, "blobs", sha256 + ".zip")
+
+    def partial_path(self, url):
+        """Where to download url before it is added, next to the blobs so add() is a rename"""
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        directory = os.path.join(self.root, "partial")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name + ".zip")
+
+    def lookup(self, url=None, sha256=None):
+        """Return the path of a stored archive for url or sha256, or None"""
+        with self._lock:
+            index = self._load_index()
+            digest = sha256 or index["urls"].get(url)
+            blob = index["blobs"].get(digest)
+            if not blob:
+                return None
+
+            path = self.blob_path(digest)
+            try:
+                valid = os.path.getsize(path) == blob["size"]
+            except OSError:
+                valid = False
+            if not valid:
+                self._forget(index, digest)
+                self._save_index(index)
+                return None
+
+            if url:
+                index["urls"][url] = digest
+            blob["last_used"] = time.time()
+            self._save_index(index)
+            return path
+
+    def add(self, url, path, sha256=None):
+        """Move a downloaded archive into the store and return its new path"""
+        digest = sha256 or file_sha256(path)
+        target = self.blob_path(digest)
+        with self._lock:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.exists(target):
+                os.remove(path)
+            else:
+                shutil.move(path, target)
+
+            index = self._load_index()
+            index["urls"][url] = digest
+            index["blobs"][digest] = {
+                "size": os.path.getsize(target),
+                "last_used": time.time()
+            }
+            self._evict(index, keep=digest)
+            self._save_index(index)
+        return target
+
+    def _evict(self, index, keep):
+        total = sum(blob["size"] for blob in index["blobs"].values())
+        by_age = sorted(index["blobs"].items(), key=lambda item: item[1]["last_used"])
+        for digest, blob in by_age:
+            if total <= self.limit:
+                break
+            if digest == keep:
+                continue
+            try:
+                os.remove(self.blob_path(digest))
+            except OSError as e:
+                print(f"Error: cached artifact {digest} could not be removed: {e}")
+                continue
+            total -= blob["size"]
+            self._forget(index, digest)
+
+    def _forget(self, index, digest):
+        index["blobs"].pop(digest, None)
+        for url in [url for url, value in index["urls"].items() if value == digest]:
+            del index["urls"][url]
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if isinstance(index.get("urls"), dict) and isinstance(index.get("blobs"), dict):
+                return index
+        except (OSError, ValueError):
+            pass
+        return {"urls": {}, "blobs": {}}
+
+    def _save_index(self, index):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"Error: artifact index could not be saved: {e}")
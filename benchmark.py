@@ -0,0 +1,686 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import socket
+import contextlib
+import hashlib
+import zipfile
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+import http.server
+from urllib.parse import urlparse, parse_qs
+
+from extractor import extract_all, DEFAULT_WORKERS
+from downloader import DEFAULT_SEGMENTS
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(ROOT, "main.py")
+FIRST_PAINT_BUDGET_MS = 1500
+IMPORT_BUDGET_MS = 600
+
+def make_archive(path, files, file_size):
+    """Write a synthetic release-like archive of many small, half compressible files"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for i in range(files):
+            data = os.urandom(file_size // 2) + b"jule" * (file_size // 8)
+            zip_ref.writestr(f"jule/std/pkg{i % 64}/file{i}.jule", data)
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+def bench_extract(args, work_dir):
+    """Compare ZipFile.extractall against the parallel extractor"""
+    archive = os.path.join(work_dir, "bench.zip")
+    make_archive(archive, args.files, args.file_size)
+    total_bytes = args.files * args.file_size
+
+    results = {}
+    for name in ("extractall", "parallel"):
+        runs = []
+        for _ in range(args.repeat):
+            target = os.path.join(work_dir, name)
+            shutil.rmtree(target, ignore_errors=True)
+            if name == "extractall":
+                with zipfile.ZipFile(archive, 'r') as zip_ref:
+                    runs.append(timed(zip_ref.extractall, target))
+            else:
+                runs.append(timed(extract_all, archive, target, workers=args.workers))
+        best = min(runs)
+        results[name] = {
+            "seconds": round(best, 4),
+            "files_per_second": round(args.files / best),
+            "mb_per_second": round(total_bytes / best / 1e6, 2)
+        }
+
+    results["speedup"] = round(results["extractall"]["seconds"] / results["parallel"]["seconds"], 2)
+    results["files"] = args.files
+    results["workers"] = args.workers
+    return results
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_file_server(directory):
+    """Serve directory over HTTP on localhost, return (process, base url)"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "http.server", str(port), "--bind", "127.0.0.1",
+         "--directory", directory],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            if time.monotonic() > deadline:
+                process.kill()
+                raise
+            time.sleep(0.05)
+
+def legacy_download(url, destination, on_progress):
+    """The original DownloadThread loop, 1 KiB reads and one event per read"""
+    import requests
+    response = requests.get(url, stream=True)
+    total_size = int(response.headers.get('content-length', 0))
+    downloaded = 0
+    with open(destination, 'wb') as f:
+        for data in response.iter_content(1024):
+            downloaded += len(data)
+            f.write(data)
+            on_progress(int((downloaded / total_size) * 100))
+
+def bench_progress(args, work_dir):
+    """Progress events and CPU time of the old and current download loops"""
+    from downloader import Downloader
+
+    source = os.path.join(work_dir, "serve")
+    os.makedirs(source)
+    with open(os.path.join(source, "release.zip"), 'wb') as f:
+        f.write(os.urandom(args.size))
+
+    process, base_url = start_file_server(source)
+    url = f"{base_url}/release.zip"
+    results = {"bytes": args.size}
+    try:
+        for name in ("legacy", "current"):
+            runs = []
+            for _ in range(args.repeat):
+                destination = os.path.join(work_dir, name + ".zip")
+                events = []
+                cpu_start = time.process_time()
+                wall_start = time.perf_counter()
+                if name == "legacy":
+                    legacy_download(url, destination, events.append)
+                else:
+                    Downloader(url, destination, segments=args.segments,
+                               on_progress=events.append).download()
+                runs.append((time.process_time() - cpu_start,
+                             time.perf_counter() - wall_start, len(events)))
+                os.remove(destination)
+            cpu, wall, events = min(runs)
+            results[name] = {
+                "progress_events": events,
+                "cpu_seconds": round(cpu, 4),
+                "wall_seconds": round(wall, 4)
+            }
+    finally:
+        process.kill()
+        process.wait()
+
+    results["event_reduction"] = round(results["legacy"]["progress_events"] /
+                                       max(1, results["current"]["progress_events"]), 1)
+    results["cpu_speedup"] = round(results["legacy"]["cpu_seconds"] /
+                                   max(1e-6, results["current"]["cpu_seconds"]), 2)
+    return results
+
+RELEASES_PATH = "/repos/julelang/jule/releases"
+ASSET_NAME = "jule-windows-amd64.zip"
+
+class ReleaseHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, so connection reuse counts like it does against GitHub
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond()
+
+    def respond(self, head=False):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlparse(self.path)
+        if url.path == RELEASES_PATH:
+            self.send_releases(parse_qs(url.query), head)
+        elif url.path.startswith("/assets/") and url.path.endswith(ASSET_NAME):
+            self.send_asset(head)
+        else:
+            self.send_error(404)
+
+    def send_releases(self, query, head):
+        server = self.server
+        if self.headers.get("If-None-Match") == server.releases_etag:
+            self.send_response(304)
+            self.send_header("ETag", server.releases_etag)
+            self.end_headers()
+            return
+
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        releases = server.releases[(page - 1) * per_page:page * per_page]
+        body = json.dumps(releases).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", server.releases_etag)
+        if page * per_page < len(server.releases):
+            next_url = f"{server.base_url}{RELEASES_PATH}?per_page={per_page}&page={page + 1}"
+            self.send_header("Link", f'<{next_url}>; rel="next"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def send_asset(self, head):
+        server = self.server
+        data = memoryview(server.archive)
+        status = 200
+        requested = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if server.ranges and requested and if_range in (None, server.archive_etag):
+            first, last = requested[len("bytes="):].split("-")
+            start = int(first)
+            end = min(int(last), len(data) - 1) if last else len(data) - 1
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("ETag", server.archive_etag)
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            data = data[start:end + 1]
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if head:
+            return
+        server.count_asset(len(data))
+        if not (server.bandwidth or server.cut_after):
+            self.wfile.write(data)
+            return
+
+        sent = 0
+        block = 64 * 1024
+        while sent < len(data):
+            if server.cut_after and sent >= server.cut_after:
+                # Drop the connection mid-body, like a CDN node going away
+                self.close_connection = True
+                return
+            chunk = data[sent:sent + block]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if server.bandwidth:
+                time.sleep(len(chunk) / server.bandwidth)
+
+class ReleaseServer(http.server.ThreadingHTTPServer):
+    """Stand-in for the GitHub releases API and its CDN, serving one synthetic archive.
+
+    Every release links the same archive; the catalog is paginated like
+    GitHub's. latency is added to every request, ranges can be turned off
+    to measure the single-stream fallback. bandwidth limits every response
+    to that many bytes per second, cut_after drops every response after
+    that many bytes.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, archive_path, releases=100, ranges=True, latency=0, bandwidth=0,
+                 cut_after=0):
+        super().__init__(("127.0.0.1", 0), ReleaseHandler)
+        self.ranges = ranges
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.cut_after = cut_after
+        with open(archive_path, 'rb') as f:
+            self.archive = f.read()
+        self.sha256 = hashlib.sha256(self.archive).hexdigest()
+        self.archive_etag = f'"{self.sha256[:16]}"'
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.api_url = self.base_url + RELEASES_PATH
+        self.releases = [self.release(i) for i in range(releases, 0, -1)]
+        self.releases_etag = f'"releases-{releases}"'
+        self.asset_requests = 0
+        self.asset_bytes = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def release(self, number):
+        tag = f"bench0.{number}"
+        return {
+            "tag_name": tag,
+            "published_at": "2025-01-01T00:00:00Z",
+            "body": f"## Jule {tag}\n\n" + "- Fixed something in the standard library\n" * 40,
+            "assets": [{
+                "name": ASSET_NAME,
+                "browser_download_url": f"{self.base_url}/assets/{tag}/{ASSET_NAME}",
+                "digest": f"sha256:{self.sha256}"
+            }]
+        }
+
+    def handle_error(self, request, client_address):
+        # A client dropping its connection mid-body is expected, e.g. after a bad range
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count_asset(self, size):
+        with self._lock:
+            self.asset_requests += 1
+            self.asset_bytes += size
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+def best(runs):
+    return min(runs) if runs else None
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds else None
+
+def bench_suite(args, work_dir):
+    """Catalog, download, extraction and end-to-end install against a local release server"""
+    from catalog import CatalogCache
+    from downloader import Downloader
+    from engine import InstallEngine, PostInstallSteps
+    from http_session import configure
+
+    # Keep the catalog cache and artifact store inside work_dir
+    os.environ["LOCALAPPDATA"] = os.path.join(work_dir, "appdata")
+    archive = os.path.join(work_dir, "release.zip")
+    make_archive(archive, args.files, args.file_size)
+    archive_size = os.path.getsize(archive)
+    content_bytes = args.files * args.file_size
+
+    timings = {name: [] for name in ("catalog", "revalidate", "download", "extract",
+                                     "install", "install_cached", "switch")}
+    with ReleaseServer(archive, args.releases, not args.no_ranges,
+                       args.latency_ms / 1000) as server:
+        for run in range(args.repeat):
+            # A fresh session per run, so no run reuses another's connections
+            session = configure()
+            cache = CatalogCache(server.api_url, os.path.join(work_dir, f"catalog{run}.json"))
+            timings["catalog"].append(timed(cache.refresh))
+            timings["revalidate"].append(timed(cache.refresh))
+            url = cache.versions[0].download_url
+
+            download_path = os.path.join(work_dir, "download.zip")
+            timings["download"].append(timed(Downloader(url, download_path,
+                                                        segments=args.segments).download))
+            os.remove(download_path)
+
+            target = os.path.join(work_dir, "extract")
+            timings["extract"].append(timed(extract_all, archive, target))
+            shutil.rmtree(target)
+
+            root = os.path.join(work_dir, f"install{run}")
+            shutil.rmtree(os.path.join(work_dir, "appdata", "jule-installer", "artifacts"),
+                          ignore_errors=True)
+            for name, tag in (("install", cache.versions[0].version),
+                              ("install_cached", cache.versions[1].version),
+                              ("switch", cache.versions[0].version)):
+                engine = InstallEngine(
+                    f"{server.base_url}/assets/{tag}/{ASSET_NAME}",
+                    root,
+                    add_to_path=False,
+                    segments=args.segments,
+                    steps=PostInstallSteps,
+                    sha256=server.sha256,
+                    api_url=server.api_url,
+                    version=tag
+                )
+                timings[name].append(timed(engine.run))
+            shutil.rmtree(root)
+            stats = session.stats.as_dict()
+
+    catalog = best(timings["catalog"])
+    download = best(timings["download"])
+    extract = best(timings["extract"])
+    return {
+        "config": {
+            "releases": args.releases,
+            "files": args.files,
+            "file_size": args.file_size,
+            "archive_bytes": archive_size,
+            "ranges": not args.no_ranges,
+            "latency_ms": args.latency_ms,
+            "segments": args.segments,
+            "repeat": args.repeat
+        },
+        "catalog": {
+            "seconds": round(catalog, 4),
+            "revalidate_seconds": round(best(timings["revalidate"]), 4),
+            "releases_per_second": rate(args.releases, catalog)
+        },
+        "download": {
+            "seconds": round(download, 4),
+            "mb_per_second": rate(archive_size / 1e6, download)
+        },
+        "extract": {
+            "seconds": round(extract, 4),
+            "mb_per_second": rate(content_bytes / 1e6, extract),
+            "files_per_second": rate(args.files, extract)
+        },
+        "install": {
+            "seconds": round(best(timings["install"]), 4),
+            "from_store_seconds": round(best(timings["install_cached"]), 4),
+            "switch_seconds": round(best(timings["switch"]), 4)
+        },
+        "connections": stats
+    }
+
+def bench_mirrors(args, work_dir):
+    """Mirror ranking and failover against local servers of different speeds"""
+    from downloader import Downloader
+    from mirrors import PROBE_BYTES, mirror_url, rank_mirrors
+
+    archive = os.path.join(work_dir, "release.zip")
+    make_archive(archive, args.files, args.file_size)
+    archive_size = os.path.getsize(archive)
+
+    speeds = [args.primary_mbps] + args.mirror_mbps
+    fastest = speeds.index(max(speeds))
+    with contextlib.ExitStack() as stack:
+        servers = []
+        for index, mbps in enumerate(speeds):
+            # The fastest server breaks off every response part way through, after
+            # the probe's bytes so it is ranked first and the download fails over
+            cut_after = 0
+            if args.cut_fastest and index == fastest:
+                cut_after = max(archive_size // (args.segments * 2), 2 * PROBE_BYTES)
+            servers.append(stack.enter_context(ReleaseServer(
+                archive, releases=1, latency=args.latency_ms / 1000,
+                bandwidth=mbps * 1e6, cut_after=cut_after
+            )))
+
+        url = servers[0].releases[0]["assets"][0]["browser_download_url"]
+        urls = [url] + [mirror_url(server.base_url + "/assets", url) for server in servers[1:]]
+        start = time.perf_counter()
+        probes = rank_mirrors(urls)
+        ranking_seconds = time.perf_counter() - start
+
+        downloader = Downloader(url, os.path.join(work_dir, "download.zip"),
+                                segments=args.segments, sha256=servers[0].sha256,
+                                mirrors=[probe.url for probe in probes])
+        download_seconds = timed(downloader.download)
+
+    names = {server.base_url: f"server{index} ({speeds[index]} MB/s)"
+             for index, server in enumerate(servers)}
+
+    def name(mirror):
+        return next(label for base, label in names.items() if mirror.startswith(base))
+
+    return {
+        "archive_bytes": archive_size,
+        "ranking": [dict(probe.as_dict(), url=name(probe.url)) for probe in probes],
+        "ranking_seconds": round(ranking_seconds, 4),
+        "started_on": name(probes[0].url),
+        "finished_on": name(downloader.current_url),
+        "download_seconds": round(download_seconds, 4),
+        "mb_per_second": rate(archive_size / 1e6, download_seconds),
+        "sha256_verified": downloader.sha256 == servers[0].sha256
+    }
+
+def bench_proxy(args, work_dir):
+    """Many installers downloading through one LAN cache, which fetches from upstream once"""
+    from cache_server import CacheServer
+    from catalog import CatalogCache, published_sha256
+    from downloader import Downloader
+
+    archive = os.path.join(work_dir, "release.zip")
+    make_archive(archive, args.files, args.file_size)
+    archive_size = os.path.getsize(archive)
+
+    def run_clients(api_url, wave):
+        results = [None] * args.clients
+
+        def client(index):
+            start = time.perf_counter()
+            cache = CatalogCache(api_url, path=os.path.join(work_dir, f"{wave}-{index}.json"))
+            version = cache.refresh()[0]
+            downloader = Downloader(version.download_url,
+                                    os.path.join(work_dir, f"{wave}-{index}.zip"),
+                                    segments=args.segments, sha256=published_sha256(version))
+            downloader.download()
+            results[index] = (time.perf_counter() - start, downloader.sha256)
+
+        threads = [threading.Thread(target=client, args=(index,)) for index in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+        for index in range(args.clients):
+            os.remove(os.path.join(work_dir, f"{wave}-{index}.zip"))
+        return results, seconds
+
+    with ReleaseServer(archive, releases=args.releases, latency=args.latency_ms / 1000,
+                       bandwidth=args.upstream_mbps * 1e6) as upstream:
+        proxy = CacheServer(("127.0.0.1", 0), cache_dir=os.path.join(work_dir, "proxy"),
+                            upstream=upstream.api_url, segments=args.segments)
+        threading.Thread(target=proxy.serve_forever, daemon=True).start()
+        proxy_url = f"http://{proxy.host}/releases"
+        try:
+            cold, cold_seconds = run_clients(proxy_url, "cold")
+            cold_upstream = (upstream.asset_requests, upstream.asset_bytes)
+            warm, warm_seconds = run_clients(proxy_url, "warm")
+        finally:
+            proxy.shutdown()
+            proxy.server_close()
+
+    def wave(results, seconds, upstream_requests, upstream_bytes):
+        return {
+            "seconds": round(seconds, 4),
+            "slowest_client_seconds": round(max(result[0] for result in results), 4),
+            "upstream_asset_requests": upstream_requests,
+            "upstream_asset_bytes": upstream_bytes,
+            "client_mb_per_second": rate(args.clients * archive_size / 1e6, seconds),
+            "sha256_verified": all(result[1] == upstream.sha256 for result in results)
+        }
+
+    return {
+        "clients": args.clients,
+        "archive_bytes": archive_size,
+        "upstream_mbps": args.upstream_mbps,
+        "upstream_fetches": proxy.upstream_fetches,
+        "served_bytes": proxy.served_bytes,
+        "cold": wave(cold, cold_seconds, *cold_upstream),
+        "warm": wave(warm, warm_seconds, upstream.asset_requests - cold_upstream[0],
+                     upstream.asset_bytes - cold_upstream[1])
+    }
+
+def parse_importtime(stderr):
+    """Return (total self time in ms, slowest top-level imports) from -X importtime output"""
+    total_us = 0
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        # Nested imports are indented under the module that triggered them
+        if not name[1:].startswith(" "):
+            top_level.append((int(cumulative_us), name.strip()))
+    top_level.sort(reverse=True)
+    slowest = [{"module": name, "ms": round(us / 1000, 1)} for us, name in top_level[:10]]
+    return total_us / 1000, slowest
+
+def imported(stderr, module):
+    """Return True if -X importtime output shows module, or one of its submodules"""
+    return re.search(rf"\|\s+{re.escape(module)}(\.\S+)?$", stderr, re.MULTILINE) is not None
+
+def run_startup(args, extra_args, env, marker=None):
+    """Start main.py once, returning wall-clock ms to marker (or exit) and the import profile"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-X", "importtime", MAIN_SCRIPT] + extra_args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env
+    )
+    elapsed = None
+    if marker:
+        for line in process.stdout:
+            if line.strip() == marker:
+                elapsed = time.perf_counter() - start
+                break
+    stdout, stderr = process.communicate(timeout=args.timeout)
+    if elapsed is None:
+        if marker:
+            raise RuntimeError(f"main.py exited before {marker}:\n{stderr[-2000:]}")
+        elapsed = time.perf_counter() - start
+    import_ms, slowest = parse_importtime(stderr)
+    return elapsed * 1000, import_ms, slowest, stderr
+
+def bench_startup(args, work_dir):
+    """Time to first paint of the wizard and startup of the headless CLI"""
+    env = dict(os.environ, JULE_STARTUP_PROBE="1")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    results = {}
+    modes = {
+        "headless": (["--headless", "--help"], None),
+        "gui": ([], "first-paint")
+    }
+    for mode in args.modes:
+        extra_args, marker = modes[mode]
+        runs = [run_startup(args, extra_args, env, marker) for _ in range(args.repeat)]
+        wall = [run[0] for run in runs]
+        imports = [run[1] for run in runs]
+        stderr = runs[-1][3]
+        results[mode] = {
+            "wall_ms": round(statistics.median(wall), 1),
+            "import_ms": round(statistics.median(imports), 1),
+            "slowest_imports": runs[-1][2],
+            "imports_pyqt5": imported(stderr, "PyQt5"),
+            "imports_requests": imported(stderr, "requests")
+        }
+
+    over_budget = []
+    if "gui" in results:
+        if results["gui"]["wall_ms"] > args.budget_ms:
+            over_budget.append(f"first paint {results['gui']['wall_ms']} ms > {args.budget_ms} ms")
+        if results["gui"]["import_ms"] > args.import_budget_ms:
+            over_budget.append(f"imports {results['gui']['import_ms']} ms > {args.import_budget_ms} ms")
+    if "headless" in results and results["headless"]["imports_pyqt5"]:
+        over_budget.append("headless mode imported PyQt5")
+    results["over_budget"] = over_budget
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Jule installer benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract = subparsers.add_parser("extract", help="zip extraction throughput")
+    extract.add_argument("--files", type=int, default=5000)
+    extract.add_argument("--file-size", type=int, default=4096)
+    extract.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    extract.add_argument("--repeat", type=int, default=3)
+    extract.set_defaults(func=bench_extract)
+
+    startup = subparsers.add_parser("startup", help="main.py startup time and import profile")
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.add_argument("--timeout", type=float, default=60)
+    startup.add_argument("--modes", nargs="+", choices=["gui", "headless"],
+                         default=["gui", "headless"])
+    startup.add_argument("--budget-ms", type=float, default=FIRST_PAINT_BUDGET_MS,
+                         help="fail when the median time to first paint is higher")
+    startup.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                         help="fail when the median total import time is higher")
+    startup.set_defaults(func=bench_startup)
+
+    progress = subparsers.add_parser("progress", help="download loop progress events and CPU time")
+    progress.add_argument("--size", type=int, default=64 * 1024 * 1024)
+    progress.add_argument("--segments", type=int, default=1,
+                          help="connections for the current loop, 1 compares like for like")
+    progress.add_argument("--repeat", type=int, default=3)
+    progress.set_defaults(func=bench_progress)
+
+    suite = subparsers.add_parser("suite", help="catalog, download, extraction and install "
+                                                "against a local release server")
+    suite.add_argument("--releases", type=int, default=100)
+    suite.add_argument("--files", type=int, default=2000)
+    suite.add_argument("--file-size", type=int, default=8192)
+    suite.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS)
+    suite.add_argument("--latency-ms", type=float, default=0,
+                       help="delay added to every request")
+    suite.add_argument("--no-ranges", action="store_true",
+                       help="serve without Range support")
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.set_defaults(func=bench_suite)
+
+    mirrors = subparsers.add_parser("mirrors", help="mirror ranking and failover against "
+                                                    "local servers of different speeds")
+    mirrors.add_argument("--files", type=int, default=2000)
+    mirrors.add_argument("--file-size", type=int, default=8192)
+    mirrors.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS)
+    mirrors.add_argument("--latency-ms", type=float, default=20)
+    mirrors.add_argument("--primary-mbps", type=float, default=2,
+                         help="bandwidth of the server the release links to")
+    mirrors.add_argument("--mirror-mbps", type=float, nargs="+", default=[10, 40],
+                         help="bandwidth of each mirror")
+    mirrors.add_argument("--cut-fastest", action="store_true",
+                         help="make the fastest server drop its connections mid-download")
+    mirrors.set_defaults(func=bench_mirrors)
+
+    proxy = subparsers.add_parser("proxy", help="concurrent installers behind the LAN "
+                                                "cache, served from one upstream download")
+    proxy.add_argument("--clients", type=int, default=16)
+    proxy.add_argument("--releases", type=int, default=10)
+    proxy.add_argument("--files", type=int, default=2000)
+    proxy.add_argument("--file-size", type=int, default=8192)
+    proxy.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS)
+    proxy.add_argument("--latency-ms", type=float, default=20,
+                       help="delay added to every upstream request")
+    proxy.add_argument("--upstream-mbps", type=float, default=20,
+                       help="bandwidth of the upstream server")
+    proxy.set_defaults(func=bench_proxy)
+
+    args = parser.parse_args()
+    work_dir = tempfile.mkdtemp(prefix="jule-bench-")
+    try:
+        # Keep stdout for the JSON, progress and error messages go to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            results = args.func(args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    # Lets CI treat a startup regression as a failed build
+    if results.get("over_budget"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
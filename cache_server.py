@@ -0,0 +1,383 @@
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import argparse
+import threading
+import http.server
+from urllib.parse import urlparse
+
+import requests
+
+from catalog import GITHUB_API_URL, API_URL_ENV, CATALOG_TTL, PER_PAGE
+from downloader import Downloader, DEFAULT_SEGMENTS
+from http_session import get_session
+from paths import default_cache_dir
+
+DEFAULT_PORT = 8765
+RELEASES_PATH = "/releases"
+ASSETS_PATH = "/assets/"
+SERVE_BLOCK = 256 * 1024  # Bytes sent per wait on an asset still being fetched
+COMPLETE_SUFFIX = ".complete"
+
+def _is_safe_name(name):
+    return name not in ("", ".", "..") and not any(sep in name for sep in "/\\:")
+
+def parse_range(header, size):
+    """Return (start, end) inclusive for a single byte range, None to send everything.
+
+    Raises ValueError for a range that starts past the end of the file.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            # Suffix range, the last n bytes
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError(f"Range {header} is outside {size} bytes")
+    return start, end
+
+class AssetFetch:
+    """One upstream download shared by every client asking for the same asset"""
+
+    def __init__(self, server, key, url, path, sha256):
+        self.server = server
+        self.key = key
+        self.path = path
+        self.downloader = Downloader(url, path, segments=server.segments, sha256=sha256)
+        self.thread = threading.Thread(target=self._run, name=f"fetch {'/'.join(key)}",
+                                       daemon=True)
+
+    def start(self):
+        print(f"Fetching {self.downloader.url}")
+        self.thread.start()
+
+    def size(self):
+        """Block until the asset's size is known"""
+        downloader = self.downloader
+        downloader.wait_started()
+        if downloader.ranges:
+            return downloader.total_size
+        # Streamed without ranges, wait_started() returned because it finished
+        return os.path.getsize(self.path)
+
+    def _run(self):
+        downloader = self.downloader
+        try:
+            downloader.download()
+            marker = {
+                "url": downloader.url,
+                "size": os.path.getsize(self.path),
+                "sha256": downloader.sha256
+            }
+            with open(self.path + COMPLETE_SUFFIX, 'w', encoding='utf-8') as f:
+                json.dump(marker, f)
+            print(f"Cached {'/'.join(self.key)} ({marker['size'] / 1e6:.1f} MB)")
+        except Exception as e:
+            print(f"Error: {downloader.url} could not be fetched: {e}")
+        finally:
+            self.server.fetch_done(self.key)
+
+class CacheHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, segmented downloads open several ranges per client
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond()
+
+    def respond(self, head=False):
+        path = urlparse(self.path).path
+        try:
+            if path == RELEASES_PATH:
+                self.send_catalog(head)
+            elif path.startswith(ASSETS_PATH) and path.count("/") == 3:
+                tag, name = path[len(ASSETS_PATH):].split("/")
+                self.send_asset(tag, name, head)
+            else:
+                self.send_error(404)
+        except LookupError as e:
+            self.send_error(404, str(e))
+        except (requests.RequestException, IOError) as e:
+            print(f"Error: {path} could not be served: {e}")
+            self.send_error(502, str(e))
+
+    def send_catalog(self, head):
+        base_url = f"http://{self.headers.get('Host') or self.server.host}"
+        etag, body = self.server.catalog_body(base_url)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def send_asset(self, tag, name, head):
+        path, fetch = self.server.open_asset(tag, name)
+        size = fetch.size() if fetch else os.path.getsize(path)
+        # Stable while the asset is fetched and afterwards, so If-Range resumes work
+        etag = '"' + hashlib.sha256(f"{tag}/{name}/{size}".encode('utf-8')).hexdigest()[:16] + '"'
+
+        requested = self.headers.get("Range")
+        if self.headers.get("If-Range") not in (None, etag):
+            requested = None
+        try:
+            byte_range = parse_range(requested, size)
+        except ValueError:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start, end = byte_range or (0, size - 1)
+
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if head:
+            return
+
+        try:
+            self._copy(path, fetch, start, end + 1)
+        except OSError as e:
+            # Headers are gone already, dropping the connection tells the client
+            if not isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                print(f"Error: {tag}/{name} could not be served: {e}")
+            self.close_connection = True
+
+    def _copy(self, path, fetch, start, end):
+        # Unbuffered, a read-ahead could pick up bytes not downloaded yet
+        with open(path, 'rb', buffering=0) as f:
+            f.seek(start)
+            offset = start
+            while offset < end:
+                block_end = min(end, offset + SERVE_BLOCK)
+                if fetch:
+                    fetch.downloader.wait_for(offset, block_end)
+                data = f.read(block_end - offset)
+                if not data:
+                    raise IOError(f"{path} ended at {offset} of {end} bytes")
+                self.wfile.write(data)
+                offset += len(data)
+                self.server.count_served(len(data))
+
+class CacheServer(http.server.ThreadingHTTPServer):
+    """Release catalog and assets for a LAN, each fetched from upstream once.
+
+    Installers pointed at RELEASES_PATH get the upstream catalog with asset
+    URLs rewritten to this server. The first request for an asset starts one
+    segmented download into cache_dir; every other request for it, including
+    those arriving mid-download, is served from that file as bytes land.
+    Cached assets are served without asking upstream.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, cache_dir=None, upstream=GITHUB_API_URL,
+                 segments=DEFAULT_SEGMENTS, ttl=CATALOG_TTL):
+        super().__init__(address, CacheHandler)
+        self.host = f"{address[0] or '127.0.0.1'}:{self.server_address[1]}"
+        self.cache_dir = cache_dir or os.path.join(default_cache_dir(), "serve")
+        self.catalog_path = os.path.join(self.cache_dir, "catalog.json")
+        self.upstream = upstream
+        self.segments = segments
+        self.ttl = ttl
+        self.releases = None
+        self.etag = None
+        self.fetched_at = 0
+        self.upstream_fetches = 0
+        self.served_bytes = 0
+        self._bodies = {}
+        self._fetches = {}
+        self._lock = threading.Lock()
+        self._catalog_lock = threading.Lock()
+        self._load_catalog()
+
+    def catalog(self):
+        """Return the upstream release JSON, revalidated once it is older than ttl"""
+        with self._catalog_lock:
+            if self.releases is None or time.time() - self.fetched_at >= self.ttl:
+                try:
+                    self._refresh_catalog()
+                except (requests.RequestException, ValueError) as e:
+                    if self.releases is None:
+                        raise
+                    print(f"Error: catalog could not be revalidated, serving the cached one: {e}")
+                    # Retried after another ttl instead of on every request
+                    self.fetched_at = time.time()
+            return self.releases
+
+    def catalog_body(self, base_url):
+        """Return (etag, JSON body) of the catalog with asset URLs under base_url"""
+        releases = self.catalog()
+        with self._catalog_lock:
+            if base_url not in self._bodies:
+                rewritten = []
+                for release in releases:
+                    assets = [dict(asset, browser_download_url=
+                                   f"{base_url}{ASSETS_PATH}{release['tag_name']}/{asset['name']}")
+                              for asset in release["assets"]]
+                    rewritten.append(dict(release, assets=assets))
+                body = json.dumps(rewritten).encode('utf-8')
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                self._bodies[base_url] = (etag, body)
+            return self._bodies[base_url]
+
+    def find_asset(self, tag, name):
+        """Return the upstream release asset JSON, raising LookupError if there is none"""
+        for release in self.catalog():
+            if release["tag_name"] == tag:
+                for asset in release["assets"]:
+                    if asset["name"] == name:
+                        return asset
+        raise LookupError(f"No asset {name} in release {tag}")
+
+    def open_asset(self, tag, name):
+        """Return (path, fetch) for an asset, starting the upstream download if needed.
+
+        fetch is None once the asset is complete on disk; otherwise it is
+        the download every concurrent request shares.
+        """
+        if not (_is_safe_name(tag) and _is_safe_name(name)):
+            raise LookupError(f"No asset {name} in release {tag}")
+        key = (tag, name)
+        path = os.path.join(self.cache_dir, "assets", tag, name)
+        with self._lock:
+            fetch = self._fetches.get(key)
+            if fetch or os.path.exists(path + COMPLETE_SUFFIX):
+                return path, fetch
+
+        # Outside the lock, a catalog refresh must not hold up cached assets
+        asset = self.find_asset(tag, name)
+        digest = asset.get("digest") or ""
+        sha256 = digest[len("sha256:"):] if digest.startswith("sha256:") else None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            fetch = self._fetches.get(key)
+            if fetch or os.path.exists(path + COMPLETE_SUFFIX):
+                return path, fetch
+            fetch = AssetFetch(self, key, asset["browser_download_url"], path, sha256)
+            self._fetches[key] = fetch
+            self.upstream_fetches += 1
+        fetch.start()
+        return path, fetch
+
+    def fetch_done(self, key):
+        with self._lock:
+            self._fetches.pop(key, None)
+
+    def count_served(self, size):
+        with self._lock:
+            self.served_bytes += size
+
+    def _load_catalog(self):
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get("upstream") != self.upstream:
+                return
+            self.releases = entry["releases"]
+            self.etag = entry.get("etag")
+            self.fetched_at = entry.get("fetched_at", 0)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _refresh_catalog(self):
+        headers = {}
+        if self.releases is not None and self.etag:
+            headers["If-None-Match"] = self.etag
+
+        session = get_session()
+        response = session.get(self.upstream, params={"per_page": PER_PAGE}, headers=headers)
+        if response.status_code == 304:
+            self.fetched_at = time.time()
+            return
+        response.raise_for_status()
+        etag = response.headers.get("etag")
+
+        releases = []
+        while True:
+            releases.extend(response.json())
+            next_url = response.links.get("next", {}).get("url")
+            if not next_url:
+                break
+            response = session.get(next_url)
+            response.raise_for_status()
+
+        self.releases = releases
+        self.etag = etag
+        self.fetched_at = time.time()
+        self._bodies = {}
+        self._save_catalog()
+
+    def _save_catalog(self):
+        entry = {
+            "upstream": self.upstream,
+            "etag": self.etag,
+            "fetched_at": self.fetched_at,
+            "releases": self.releases
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self.catalog_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self.catalog_path)
+        except OSError as e:
+            print(f"Error: release catalog could not be cached: {e}")
+
+def main(argv=None):
+    """Serve the release catalog and assets to installers on the LAN, never imports PyQt5"""
+    parser = argparse.ArgumentParser(description="Cache Jule releases for installers on the LAN")
+    parser.add_argument("--serve-cache", action="store_true", help="run the caching server")
+    parser.add_argument("--bind", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-dir", help="where assets are stored, "
+                                            "default serve/ in the installer cache")
+    parser.add_argument("--upstream", default=GITHUB_API_URL, help="releases API to cache")
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS,
+                        help="parallel connections per upstream download")
+    args = parser.parse_args(argv)
+
+    server = CacheServer((args.bind, args.port), cache_dir=args.cache_dir,
+                         upstream=args.upstream, segments=args.segments)
+    host = socket.gethostname() if args.bind == "0.0.0.0" else args.bind
+    url = f"http://{host}:{server.server_address[1]}{RELEASES_PATH}"
+    print(f"Serving Jule releases from {server.cache_dir} at {url}")
+    print(f"Point installers at it with --api-url {url} or {API_URL_ENV}={url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
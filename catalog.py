@@ -0,0 +1,386 @@
+import os
+import re
+import json
+import time
+import hashlib
+import platform
+from datetime import datetime
+
+from http_session import get_session
+from paths import default_cache_dir
+
+GITHUB_API_URL = "https://api.github.com/repos/julelang/jule/releases"
+API_URL_ENV = "JULE_API_URL"
+# A LAN cache started with main.py --serve-cache can stand in for GitHub
+API_URL = os.environ.get(API_URL_ENV) or GITHUB_API_URL
+CATALOG_TTL = 15 * 60  # Seconds before a cached catalog is revalidated
+PER_PAGE = 100  # GitHub's maximum page size
+CACHE_FORMAT = 4
+CHECKSUM_SUFFIXES = (".sha256", ".sha256sum")
+CHECKSUM_NAMES = ("checksums.txt", "sha256sums", "sha256sums.txt")
+
+PLATFORMS = (("windows", r"windows|win(?:32|64)"), ("linux", r"linux"),
+             ("darwin", r"darwin|macos|osx"))
+ARCHES = (("amd64", r"amd64|x86[-_]64|x64"), ("arm64", r"arm64|aarch64"),
+          ("386", r"i?[36]86|x86"))
+SEMVER = re.compile(r"(\d+)\.(\d+)(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?")
+INSTALLER_PLATFORM = ("windows", "amd64")  # The asset the wizard installs
+
+class ReleaseAsset:
+    __slots__ = ("name", "platform", "arch", "download_url", "sha256", "checksum_url")
+
+    def __init__(self, name, platform, arch, download_url, sha256=None, checksum_url=None):
+        self.name = name
+        self.platform = platform
+        self.arch = arch
+        self.download_url = download_url
+        self.sha256 = sha256
+        self.checksum_url = checksum_url
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+class VersionInfo:
+    __slots__ = ("version", "date", "description", "download_url", "sha256",
+                 "checksum_url", "notes_path", "assets")
+
+    def __init__(self, version, date, description, download_url, sha256=None,
+                 checksum_url=None, notes_path=None, assets=None):
+        self.version = version
+        self.date = date
+        # None once the cache has moved the release notes to notes_path
+        self.description = description
+        # download_url, sha256 and checksum_url describe the INSTALLER_PLATFORM asset
+        self.download_url = download_url
+        self.sha256 = sha256
+        self.checksum_url = checksum_url
+        self.notes_path = notes_path
+        # (platform, arch) -> ReleaseAsset, arch is None when the name doesn't say
+        self.assets = assets or {}
+
+    def notes(self):
+        """Return the release notes markdown, read from the cache when not in memory"""
+        description = self.description
+        if description is not None:
+            return description
+        if not self.notes_path:
+            return ""
+        try:
+            with open(self.notes_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError as e:
+            print(f"Error: release notes could not be read: {e}")
+            return ""
+
+    def asset_for(self, platform, arch=None):
+        """Return the ReleaseAsset for platform and arch, or None"""
+        return pick_asset(self.assets, platform, arch)
+
+    def as_dict(self):
+        entry = {slot: getattr(self, slot) for slot in self.__slots__}
+        entry["assets"] = [asset.as_dict() for asset in self.assets.values()]
+        return entry
+
+    @classmethod
+    def from_dict(cls, entry):
+        entry = dict(entry)
+        assets = [ReleaseAsset(**asset) for asset in entry.pop("assets", [])]
+        return cls(assets={(asset.platform, asset.arch): asset for asset in assets}, **entry)
+
+def pick_asset(assets, platform, arch=None):
+    """Return the asset for (platform, arch), arch None matches any build of platform"""
+    asset = assets.get((platform, arch)) or assets.get((platform, None))
+    if asset is None and arch is None:
+        asset = next((asset for key, asset in assets.items() if key[0] == platform), None)
+    return asset
+
+def parse_platform(name):
+    """Return (platform, arch) named by a release asset file, or None for other files"""
+    name = name.lower()
+    if name in CHECKSUM_NAMES or name.endswith(CHECKSUM_SUFFIXES):
+        return None
+    platform = next((key for key, pattern in PLATFORMS if re.search(pattern, name)), None)
+    if platform is None:
+        return None
+    arch = next((key for key, pattern in ARCHES if re.search(pattern, name)), None)
+    return platform, arch
+
+def host_platform():
+    """Return (platform, arch) of this machine in the names parse_platform() gives assets"""
+    system = platform.system().lower()
+    machine = platform.machine().lower()
+    host = next((key for key, pattern in PLATFORMS if re.fullmatch(pattern, system)), system)
+    # An unknown machine matches any build of the platform
+    arch = next((key for key, pattern in ARCHES if re.fullmatch(pattern, machine)), None)
+    return host, arch
+
+def semver_key(tag):
+    """Sort key ordering tags like jule0.1.5 by version, pre-releases before their release"""
+    match = SEMVER.search(tag)
+    if not match:
+        # Below every tag with a version number
+        return (0,)
+    numbers = tuple(int(part or 0) for part in match.group(1, 2, 3))
+    prerelease = match.group(4)
+    if prerelease is None:
+        return (1, numbers, 1, ())
+    parts = tuple((0, int(part), "") if part.isdigit() else (1, 0, part)
+                  for part in prerelease.split("."))
+    return (1, numbers, 0, parts)
+
+class ReleaseCatalog:
+    """Versions sorted newest first by semver, with indexes for the lookups installs need"""
+
+    def __init__(self, versions):
+        # The list this index was built from, CatalogCache rebuilds when it is replaced
+        self.source = versions
+        self.versions = sorted(versions, key=lambda info: semver_key(info.version), reverse=True)
+        self.by_tag = {}
+        self.by_url = {}  # Asset URL -> ReleaseAsset
+        self.prereleases = set()
+        self.by_number = {}
+        # (major,) and (major, minor) -> versions of that series, newest first
+        self.by_series = {}
+        for info in self.versions:
+            self.by_tag.setdefault(info.version, info)
+            for asset in info.assets.values():
+                self.by_url.setdefault(asset.download_url, asset)
+            key = semver_key(info.version)
+            if key[0]:
+                numbers = key[1]
+                if key[2]:
+                    self.by_number.setdefault(numbers, info)
+                else:
+                    self.prereleases.add(info.version)
+                self.by_series.setdefault(numbers[:1], []).append(info)
+                self.by_series.setdefault(numbers[:2], []).append(info)
+
+    def find(self, spec="latest", platform=None, arch=None):
+        """Return the VersionInfo for a tag, "latest" or a series like "latest 0.1.x".
+
+        Pre-releases are only picked when no release of the series matches.
+        With platform, only releases with an asset for platform and arch
+        count. Raises LookupError when nothing matches.
+        """
+        spec = spec.strip()
+        if spec in self.by_tag:
+            candidates = [self.by_tag[spec]]
+        elif spec == "latest":
+            candidates = self.versions
+        else:
+            series = spec[len("latest"):].strip() if spec.startswith("latest") else spec
+            series = series[:-2] if series.endswith(".x") else series
+            try:
+                numbers = tuple(int(part) for part in series.split("."))
+            except ValueError:
+                numbers = ()
+            if len(numbers) == 3:
+                candidates = [self.by_number[numbers]] if numbers in self.by_number else []
+            else:
+                candidates = self.by_series.get(numbers, [])
+        releases = [info for info in candidates if info.version not in self.prereleases]
+        for info in releases + candidates:
+            if platform is None or info.asset_for(platform, arch):
+                return info
+        target = f" for {platform}-{arch or 'any'}" if platform else ""
+        raise LookupError(f"Version {spec} not found{target}")
+
+def find_checksum_asset(assets, name):
+    """Return the checksum file published for asset name, or None"""
+    for asset in assets:
+        asset_name = asset["name"].lower()
+        if asset_name in CHECKSUM_NAMES:
+            return asset
+        if asset_name.startswith(name.lower()) and asset_name.endswith(CHECKSUM_SUFFIXES):
+            return asset
+    return None
+
+def parse_checksums(text, name):
+    """Return the SHA-256 for name from a sha256sum style file, or None"""
+    lines = [line.split() for line in text.splitlines() if line.strip()]
+    for fields in lines:
+        if len(fields) >= 2 and fields[-1].lstrip("*") == name:
+            return fields[0].lower()
+    # A file holding just the digest of one asset
+    if len(lines) == 1 and len(lines[0]) == 1 and len(lines[0][0]) == 64:
+        return lines[0][0].lower()
+    return None
+
+def published_sha256(info):
+    """Return the SHA-256 published with a release asset, or None if there is none"""
+    if info.sha256:
+        return info.sha256
+    if not info.checksum_url:
+        return None
+    response = get_session().get(info.checksum_url)
+    response.raise_for_status()
+    return parse_checksums(response.text, info.download_url.rsplit("/", 1)[-1])
+
+def parse_releases(releases):
+    """Turn GitHub release JSON into VersionInfo objects for releases with a platform asset"""
+    versions = []
+    for release in releases:
+        assets = {}
+        for asset in release["assets"]:
+            key = parse_platform(asset["name"])
+            if key is None or key in assets:
+                continue
+            # GitHub publishes "sha256:<hex>" for assets uploaded since mid 2025
+            digest = asset.get("digest") or ""
+            checksum_asset = find_checksum_asset(release["assets"], asset["name"])
+            assets[key] = ReleaseAsset(
+                name=asset["name"],
+                platform=key[0],
+                arch=key[1],
+                download_url=asset["browser_download_url"],
+                sha256=digest[len("sha256:"):] if digest.startswith("sha256:") else None,
+                checksum_url=checksum_asset["browser_download_url"] if checksum_asset else None
+            )
+        if not assets:
+            continue
+
+        # Parse date
+        date_str = release["published_at"].split("T")[0]
+        date = datetime.strptime(date_str, "%Y-%m-%d")
+        formatted_date = date.strftime("%B %d, %Y")
+
+        # The wizard's asset, any Windows build when there is no amd64 one
+        installer_asset = pick_asset(assets, *INSTALLER_PLATFORM) or \
+            pick_asset(assets, INSTALLER_PLATFORM[0])
+        versions.append(VersionInfo(
+            version=release["tag_name"],
+            date=formatted_date,
+            description=release["body"],
+            download_url=installer_asset.download_url if installer_asset else None,
+            sha256=installer_asset.sha256 if installer_asset else None,
+            checksum_url=installer_asset.checksum_url if installer_asset else None,
+            assets=assets
+        ))
+    return versions
+
+class CatalogCache:
+    """Parsed release catalog kept on disk with the validators needed to revalidate it"""
+
+    def __init__(self, url=API_URL, path=None, ttl=CATALOG_TTL):
+        self.url = url
+        self.path = path or os.path.join(default_cache_dir(), "releases.json")
+        self.ttl = ttl
+        self.versions = None
+        self._index = None
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0
+
+    @property
+    def fresh(self):
+        return self.versions is not None and time.time() - self.fetched_at < self.ttl
+
+    def load(self):
+        """Read the cached catalog, returning its versions or None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get("format") != CACHE_FORMAT or entry.get("url") != self.url:
+                return None
+            self.versions = [VersionInfo.from_dict(version) for version in entry["versions"]]
+            self.etag = entry.get("etag")
+            self.last_modified = entry.get("last_modified")
+            self.fetched_at = entry.get("fetched_at", 0)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return self.versions
+
+    def index(self):
+        """Return the ReleaseCatalog of the loaded versions, built once per load or refresh"""
+        if self._index is None or self._index.source is not self.versions:
+            self._index = ReleaseCatalog(self.versions or [])
+        return self._index
+
+    def find_asset(self, download_url):
+        """Return the cached ReleaseAsset for an asset URL, or None"""
+        if self.versions is None:
+            self.load()
+        return self.index().by_url.get(download_url)
+
+    def save(self):
+        self._store_notes()
+        entry = {
+            "format": CACHE_FORMAT,
+            "url": self.url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "versions": [version.as_dict() for version in self.versions]
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error: release catalog could not be cached: {e}")
+
+    def _store_notes(self):
+        """Move release notes out of memory into one file per release"""
+        notes_dir = os.path.join(os.path.dirname(self.path), "notes")
+        for version in self.versions:
+            if version.description is None:
+                continue
+            name = hashlib.sha256(version.version.encode('utf-8')).hexdigest()[:16]
+            path = os.path.join(notes_dir, name + ".md")
+            try:
+                os.makedirs(notes_dir, exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(version.description)
+            except OSError as e:
+                print(f"Error: release notes could not be cached: {e}")
+                continue
+            # Path first, a reader on another thread always finds one of the two
+            version.notes_path = path
+            version.description = None
+
+    def refresh(self, on_page=None):
+        """Revalidate against the API, returning new versions or None if unchanged.
+
+        Every page linked from the first one is fetched; on_page receives the
+        versions of each page as soon as it is parsed.
+        """
+        headers = {}
+        if self.versions is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        # Releases are newest first, an unchanged first page means nothing was added
+        session = get_session()
+        response = session.get(self.url, params={"per_page": PER_PAGE}, headers=headers)
+        if response.status_code == 304:
+            # Not modified, and not counted against the GitHub rate limit
+            self.fetched_at = time.time()
+            self.save()
+            return None
+        response.raise_for_status()
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+
+        versions = []
+        while True:
+            page = parse_releases(response.json())
+            versions.extend(page)
+            if on_page and page:
+                on_page(page)
+
+            next_url = response.links.get("next", {}).get("url")
+            if not next_url:
+                break
+            response = session.get(next_url)
+            response.raise_for_status()
+
+        self.versions = versions
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+        self.save()
+        return self.versions
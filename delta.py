@@ -0,0 +1,206 @@
+import os
+import json
+import shutil
+import zipfile
+
+from downloader import probe
+from extractor import TAIL_SIZE, COPY_BUFFER, member_extents, member_target
+from http_session import get_session
+
+MANIFEST_NAME = ".jule-manifest.json"
+MAX_GROUP_SIZE = 8 * 1024 * 1024  # Largest span fetched in one ranged request
+MAX_GROUP_GAP = 64 * 1024  # Unchanged bytes worth fetching to save a request
+
+class DeltaUnavailable(Exception):
+    """The install or the server does not allow a delta upgrade"""
+
+def read_manifest(install_path):
+    """Return the manifest written by the last install, or None"""
+    try:
+        with open(os.path.join(install_path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get("files"), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return None
+
+def write_manifest(install_path, infos, source):
+    """Record the CRC32 and size of every installed file"""
+    manifest = {
+        "source": source,
+        "files": {
+            info.filename: [info.CRC, info.file_size]
+            for info in infos if not info.is_dir()
+        }
+    }
+    path = os.path.join(install_path, MANIFEST_NAME)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+def record_install(install_path, zip_path, source):
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        write_manifest(install_path, zip_ref.infolist(), source)
+
+class HTTPRangeReader:
+    """Read-only, seekable view of a remote file backed by ranged GET requests.
+
+    Reads are served from one cached window; prefetch() loads a whole span
+    so the members inside it can be read without further requests.
+    """
+
+    def __init__(self, url, size):
+        self.url = url
+        self.size = size
+        self.pos = 0
+        self.fetched_bytes = 0
+        self.requests = 0
+        self._window_start = 0
+        self._window = b""
+        self.prefetch(max(0, size - TAIL_SIZE), size)
+
+    def prefetch(self, start, end):
+        """Load bytes start..end (exclusive) with a single request"""
+        headers = {'Range': f'bytes={start}-{end - 1}'}
+        with get_session().get(self.url, headers=headers) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise DeltaUnavailable("Server does not support range requests")
+            self._window = response.content
+        self._window_start = start
+        self.fetched_bytes += len(self._window)
+        self.requests += 1
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self.pos
+        end = min(self.size, self.pos + n)
+        window_end = self._window_start + len(self._window)
+        if self.pos < self._window_start or end > window_end:
+            self.prefetch(self.pos, max(end, min(self.size, self.pos + COPY_BUFFER)))
+        data = self._window[self.pos - self._window_start:end - self._window_start]
+        self.pos += len(data)
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self._window = b""
+
+def group_extents(extents):
+    """Merge (info, start, end) spans into as few ranged requests as is sensible"""
+    groups = []
+    for extent in sorted(extents, key=lambda item: item[1]):
+        if groups:
+            group = groups[-1]
+            gap = extent[1] - group["end"]
+            if gap <= MAX_GROUP_GAP and extent[2] - group["start"] <= MAX_GROUP_SIZE:
+                group["members"].append(extent[0])
+                group["end"] = extent[2]
+                continue
+        groups.append({"start": extent[1], "end": extent[2], "members": [extent[0]]})
+    return groups
+
+class DeltaUpgrade:
+    """Upgrade an install by fetching only the members whose CRC32 or size changed.
+
+    The new archive's central directory is read with a ranged request and
+    compared against the manifest of the current install. Changed members
+    are fetched by byte range into new files that replace the old ones, so
+    install_path may hard link another install's files. Files the new
+    release no longer ships are removed.
+    """
+
+    def __init__(self, url, install_path, on_member=None, remote=None):
+        self.url = url
+        self.remote = remote  # probe(url) when the caller already made it
+        self.install_path = os.path.abspath(install_path)
+        self.on_member = on_member
+        self.changed = 0
+        self.removed = 0
+        self.fetched_bytes = 0
+
+    def run(self):
+        manifest = read_manifest(self.install_path)
+        if manifest is None:
+            raise DeltaUnavailable("No manifest of the current install")
+
+        remote = self.remote or probe(self.url)
+        if not (remote.accepts_ranges and remote.size):
+            raise DeltaUnavailable("Server does not support range requests")
+
+        reader = HTTPRangeReader(remote.url, remote.size)
+        with zipfile.ZipFile(reader, 'r') as zip_ref:
+            infos = zip_ref.infolist()
+            for info in infos:
+                member_target(self.install_path, info.filename)
+
+            extents = [extent for extent in member_extents(zip_ref, zip_ref.start_dir)
+                       if self._needs_update(extent[0], manifest)]
+            total_bytes = sum(extent[0].file_size for extent in extents)
+            extracted_bytes = 0
+
+            for group in group_extents(extents):
+                reader.prefetch(group["start"], group["end"])
+                for info in group["members"]:
+                    self._extract(zip_ref, info)
+                    self.changed += 1
+                    extracted_bytes += info.file_size
+                    if self.on_member:
+                        self.on_member(info, extracted_bytes, total_bytes)
+
+        self._remove_obsolete(manifest, {info.filename for info in infos})
+        write_manifest(self.install_path, infos, self.url)
+        self.fetched_bytes = reader.fetched_bytes
+
+    def _needs_update(self, info, manifest):
+        if info.is_dir():
+            return not os.path.isdir(member_target(self.install_path, info.filename))
+        entry = manifest["files"].get(info.filename)
+        if entry != [info.CRC, info.file_size]:
+            return True
+        # Catch files removed or truncated since the last install
+        try:
+            return os.path.getsize(member_target(self.install_path, info.filename)) != info.file_size
+        except OSError:
+            return True
+
+    def _extract(self, zip_ref, info):
+        target = member_target(self.install_path, info.filename)
+        if info.is_dir():
+            os.makedirs(target, exist_ok=True)
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # A new file, not a rewrite, so a target hard linked to the active install stays as it was
+        with zip_ref.open(info) as source, open(target + ".tmp", 'wb') as dest:
+            shutil.copyfileobj(source, dest, COPY_BUFFER)
+        os.replace(target + ".tmp", target)
+
+    def _remove_obsolete(self, manifest, names):
+        for name in manifest["files"]:
+            if name in names:
+                continue
+            target = member_target(self.install_path, name)
+            try:
+                os.remove(target)
+                self.removed += 1
+            except OSError:
+                continue
+            # Drop directories the removal left empty, never the install root
+            directory = os.path.dirname(target)
+            while directory != self.install_path and not os.listdir(directory):
+                os.rmdir(directory)
+                directory = os.path.dirname(directory)
@@ -0,0 +1,551 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+
+from http_session import get_session
+from artifact_store import file_sha256, HASH_BUFFER
+
+DEFAULT_SEGMENTS = 4
+MIN_SEGMENT_SIZE = 1024 * 1024  # Don't split below 1 MiB per range
+CHUNK_SIZE = 64 * 1024  # First read size, adapted while streaming
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+READ_TARGET = 0.05  # Seconds one read should take on a steady connection
+PROGRESS_INTERVAL = 0.25  # Seconds between progress events when the percentage is unchanged
+RATE_SMOOTHING = 0.3  # Weight of the newest sample in the throughput average
+STATE_SUFFIX = ".state"
+STATE_SAVE_INTERVAL = 1.0  # Seconds between state file writes
+
+class RemoteChangedError(Exception):
+    """The remote file changed since the partial download was started.
+
+    Not an IOError, so it is not mistaken for a broken connection that
+    another mirror could continue.
+    """
+
+class ChecksumMismatch(IOError):
+    """The downloaded file does not match the checksum published for it"""
+
+class DownloadProgress:
+    def __init__(self, downloaded, total_size, bytes_per_second):
+        self.downloaded = downloaded
+        self.total_size = total_size
+        self.bytes_per_second = bytes_per_second
+
+    @property
+    def percent(self):
+        if not self.total_size:
+            return 0
+        return int((self.downloaded / self.total_size) * 100)
+
+    @property
+    def eta(self):
+        """Seconds left at the current rate, or -1 if unknown"""
+        if not self.total_size or not self.bytes_per_second:
+            return -1
+        return max(0, self.total_size - self.downloaded) / self.bytes_per_second
+
+class RemoteFile:
+    def __init__(self, url, size, accepts_ranges, etag=None, last_modified=None):
+        self.url = url
+        self.size = size
+        self.accepts_ranges = accepts_ranges
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def validator(self):
+        """Value usable in an If-Range header, weak ETags are not allowed there"""
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+def probe(url):
+    """Return the final URL, size, range support and validators of a remote file"""
+    response = get_session().head(url, allow_redirects=True)
+    response.raise_for_status()
+    headers = response.headers
+    return RemoteFile(
+        response.url,
+        int(headers.get('content-length', 0)),
+        headers.get('accept-ranges', '').lower() == 'bytes',
+        etag=headers.get('etag'),
+        last_modified=headers.get('last-modified')
+    )
+
+def stream_chunks(response):
+    """Yield views of one reusable buffer, read in sizes that adapt to the connection.
+
+    Reads grow while they finish well inside READ_TARGET and shrink when
+    they take much longer, so fast links use few large reads and slow
+    links still report progress often. A view is only valid until the
+    next one is requested.
+    """
+    buffer = memoryview(bytearray(MAX_CHUNK_SIZE))
+    size = CHUNK_SIZE
+    raw = response.raw
+    raw.decode_content = True
+    while True:
+        start = time.monotonic()
+        count = raw.readinto(buffer[:size])
+        if not count:
+            return
+        elapsed = time.monotonic() - start
+        yield buffer[:count]
+
+        if elapsed < READ_TARGET / 2 and count == size:
+            size = min(size * 2, MAX_CHUNK_SIZE)
+        elif elapsed > READ_TARGET * 2:
+            size = max(size // 2, MIN_CHUNK_SIZE)
+
+def split_ranges(total_size, segments):
+    """Split total_size bytes into inclusive (start, end) byte ranges"""
+    segments = max(1, min(segments, total_size // MIN_SEGMENT_SIZE))
+    step = total_size // segments
+    ranges = []
+    for i in range(segments):
+        start = i * step
+        end = total_size - 1 if i == segments - 1 else start + step - 1
+        ranges.append((start, end))
+    return ranges
+
+class Downloader:
+    """Download a file over several ranged connections when the server allows it.
+
+    on_progress receives a DownloadProgress whenever the percentage changes
+    and at least every PROGRESS_INTERVAL seconds, never for every chunk.
+    Progress is kept in a sidecar state file next to the destination so an
+    interrupted download resumes where it stopped, as long as the remote
+    file is unchanged. With tail_size set, the last tail_size bytes are
+    fetched before anything else so a zip central directory can be read
+    while the rest of the archive is still arriving.
+
+    The SHA-256 is computed while the bytes stream in. Bytes that land
+    ahead of the digest, from later ranges, are read back as soon as the
+    digest reaches them, so it is ready when the last byte is written.
+    With sha256 set the file is checked against it before download()
+    returns.
+
+    mirrors, if given, lists the URLs to fetch url from, best first. A
+    range that breaks off continues from its current offset on the next
+    mirror serving a file of the same size.
+    """
+
+    def __init__(self, url, destination, segments=DEFAULT_SEGMENTS, on_progress=None,
+                 tail_size=0, sha256=None, mirrors=None):
+        self.url = url
+        self.urls = list(mirrors) if mirrors else [url]
+        self.destination = destination
+        self.state_path = destination + STATE_SUFFIX
+        self.segments = segments
+        self.on_progress = on_progress
+        self.tail_size = tail_size
+        self.expected_sha256 = sha256.lower() if sha256 else None
+        self.sha256 = None
+        self.repaired_bytes = 0
+        self.total_size = 0
+        self.downloaded = 0
+        self.resumed_bytes = 0
+        self.ranges = []
+        self.validator = None
+        self.finished = False
+        self.error = None
+        self._last_percent = -1
+        self._last_emit = 0
+        self._last_emit_bytes = 0
+        self._rate = 0
+        self._last_save = 0
+        self.current_url = self.urls[0]
+        self._mirror = 0
+        self._mirror_lock = threading.Lock()
+        self._hasher = None
+        self._hashed = 0
+        self._hash_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+        # Notified whenever more bytes are on disk or the download ends
+        self.available = threading.Condition(self._lock)
+
+    def download(self):
+        with self.available:
+            # Called again after the remote changed under a pipelined download
+            self.finished = False
+            self.error = None
+        remote = self._probe()
+        self.total_size = remote.size
+        self.validator = remote.validator
+
+        try:
+            try:
+                self._run(remote, self._load_state(remote))
+            except RemoteChangedError as e:
+                # The partial data belongs to an older file, never resume it
+                self._remove_state()
+                if self.tail_size:
+                    # Members may already have been read from the old data, the caller starts over
+                    raise
+                print(f"Error: {e}, downloading it again")
+                remote = self._probe()
+                self.total_size = remote.size
+                self.validator = remote.validator
+                self._run(remote, None)
+        except Exception as e:
+            if not isinstance(e, RemoteChangedError):
+                self._save_state(force=True)
+            with self.available:
+                self.error = e
+                self.available.notify_all()
+            raise
+
+        self._remove_state()
+        self._finish_hash()
+        if self.expected_sha256:
+            try:
+                self.verify(self.expected_sha256)
+            except ChecksumMismatch as e:
+                with self.available:
+                    self.error = e
+                    self.available.notify_all()
+                raise
+        with self.available:
+            self.finished = True
+            self.available.notify_all()
+        return self.destination
+
+    def verify(self, sha256=None):
+        """Return the SHA-256 of the finished file, raising ChecksumMismatch if it isn't sha256.
+
+        A mismatching file is deleted so it is neither resumed nor cached.
+        """
+        digest = self.sha256 or file_sha256(self.destination)
+        if sha256 and digest != sha256.lower():
+            try:
+                os.remove(self.destination)
+            except OSError as e:
+                print(f"Error: {self.destination} could not be removed: {e}")
+            raise ChecksumMismatch(f"{self.url} has SHA-256 {digest}, expected {sha256.lower()}")
+        self.sha256 = digest
+        return digest
+
+    def refetch(self, start, end):
+        """Download bytes start..end (exclusive) again after they failed verification"""
+        # Held so the digest can't read the span while it is being replaced
+        with self._hash_lock:
+            if self._hashed > start:
+                # The bad bytes are already in the digest, verify() rereads the file
+                self._hasher = None
+                self.sha256 = None
+            headers = {'Range': f'bytes={start}-{end - 1}'}
+            if self.validator:
+                headers['If-Range'] = self.validator
+            with get_session().get(self.current_url, headers=headers) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    if self.validator:
+                        raise RemoteChangedError(f"{self.url} changed during download")
+                    raise IOError(f"Server ignored range request for bytes {start}-{end - 1}")
+                data = response.content
+            if len(data) != end - start:
+                raise IOError(f"Range {start}-{end - 1} incomplete: got {len(data)} of {end - start} bytes")
+            with open(self.destination, 'r+b') as f:
+                f.seek(start)
+                f.write(data)
+        self.repaired_bytes += len(data)
+
+    def covers(self, start, end):
+        """Return True if bytes start..end (exclusive) are already on disk"""
+        if self.finished:
+            return True
+        if not self.ranges:
+            return False
+        for range_start, range_end, done in self.ranges:
+            if range_start < end and range_end >= start:
+                if min(end, range_end + 1) > range_start + done:
+                    return False
+        return True
+
+    def wait_started(self):
+        """Block until the download is split into ranges or has finished"""
+        with self.available:
+            while not (self.ranges or self.finished):
+                if self.error:
+                    raise IOError(f"Download failed: {self.error}")
+                self.available.wait()
+
+    def wait_for(self, start, end):
+        """Block until bytes start..end (exclusive) are on disk"""
+        with self.available:
+            while not self.covers(start, end):
+                if self.error:
+                    raise IOError(f"Download failed: {self.error}")
+                self.available.wait()
+
+    def _probe(self):
+        """Probe the URLs in order, skipping mirrors that don't answer"""
+        for index, url in enumerate(self.urls):
+            try:
+                remote = probe(url)
+            except requests.RequestException as e:
+                if index + 1 < len(self.urls):
+                    print(f"Error: {url} is unavailable, trying the next mirror: {e}")
+                continue
+            self._mirror = index
+            return remote
+        # Some servers reject HEAD, a plain GET still works
+        self._mirror = 0
+        return RemoteFile(self.urls[0], 0, False)
+
+    def _fail_over(self, failed_url, error):
+        """Return the URL a broken off range continues from, or None if no mirror is left"""
+        with self._mirror_lock:
+            if self.current_url != failed_url:
+                # Another range already moved on
+                return self.current_url
+            for index in range(self._mirror + 1, len(self.urls)):
+                try:
+                    remote = probe(self.urls[index])
+                except requests.RequestException:
+                    continue
+                if remote.size != self.total_size or not remote.accepts_ranges:
+                    continue
+                print(f"Error: {failed_url} failed ({error}), continuing from {remote.url}")
+                self._mirror = index
+                # Each mirror has its own ETag, If-Range must match the one in use
+                self.validator = remote.validator
+                self.current_url = remote.url
+                return remote.url
+            return None
+
+    def _run(self, remote, ranges):
+        self._failed.clear()
+        self.current_url = remote.url
+        if ranges is None:
+            ranges = self._plan(remote)
+            if ranges:
+                # Preallocate so every worker can write its range in place
+                with open(self.destination, 'wb') as f:
+                    f.truncate(remote.size)
+        self.ranges = ranges
+        self.downloaded = self.resumed_bytes = sum(done for _, _, done in ranges)
+        self._last_percent = -1
+        # Resumed bytes are not part of this session's throughput
+        self._last_emit = time.monotonic()
+        self._last_emit_bytes = self.downloaded
+        self._rate = 0
+
+        with self._hash_lock:
+            self._hasher = hashlib.sha256()
+            self._hashed = 0
+            self.sha256 = None
+            # Resumed bytes are only on disk
+            self._catch_up()
+
+        with self.available:
+            self.available.notify_all()
+
+        pending = list(ranges)
+        if self.tail_size and len(pending) > 1:
+            # The tail is planned last, fetch it before the body
+            self._download_range(remote.url, pending.pop())
+
+        if len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                futures = [executor.submit(self._download_range, remote.url, rng)
+                           for rng in pending]
+                for future in futures:
+                    future.result()
+        elif pending:
+            self._download_range(remote.url, pending[0])
+        elif not ranges:
+            self._download_single(remote.url)
+
+    def _plan(self, remote):
+        if not (remote.accepts_ranges and remote.size):
+            return []
+        tail = min(self.tail_size, remote.size)
+        body = remote.size - tail
+        ranges = []
+        if body:
+            ranges = [[start, end, 0] for start, end in split_ranges(body, self.segments)]
+        if tail:
+            ranges.append([body, remote.size - 1, 0])
+        return ranges
+
+    def _hash(self, offset, data):
+        """Add bytes just written at offset to the digest if they are next in file order"""
+        with self._hash_lock:
+            if self._hasher is None or offset != self._hashed:
+                # Ahead of the digest, read back from disk once it gets there
+                return
+            self._hasher.update(data)
+            self._hashed += len(data)
+            self._catch_up()
+
+    def _catch_up(self):
+        while self._hasher is not None:
+            end = self._contiguous_end(self._hashed)
+            if end <= self._hashed:
+                return
+            with open(self.destination, 'rb') as f:
+                f.seek(self._hashed)
+                while self._hashed < end:
+                    block = f.read(min(HASH_BUFFER, end - self._hashed))
+                    if not block:
+                        raise IOError(f"{self.destination} is shorter than the downloaded ranges")
+                    self._hasher.update(block)
+                    self._hashed += len(block)
+
+    def _contiguous_end(self, offset):
+        """Return where the bytes already on disk from offset onwards end"""
+        for start, end, done in self.ranges:
+            if start <= offset <= end:
+                return start + done
+        return offset
+
+    def _finish_hash(self):
+        with self._hash_lock:
+            self._catch_up()
+            if self._hasher is not None and self._hashed == os.path.getsize(self.destination):
+                self.sha256 = self._hasher.hexdigest()
+
+    def _report(self, size):
+        with self.available:
+            self.downloaded += size
+            self.available.notify_all()
+            if not self.on_progress:
+                return
+
+            now = time.monotonic()
+            percent = int((self.downloaded / self.total_size) * 100) if self.total_size else 0
+            elapsed = now - self._last_emit
+            if percent == self._last_percent and elapsed < PROGRESS_INTERVAL:
+                return
+
+            if elapsed > 0:
+                sample = (self.downloaded - self._last_emit_bytes) / elapsed
+                self._rate = sample if not self._rate else \
+                    RATE_SMOOTHING * sample + (1 - RATE_SMOOTHING) * self._rate
+            self._last_percent = percent
+            self._last_emit = now
+            self._last_emit_bytes = self.downloaded
+            self.on_progress(DownloadProgress(self.downloaded, self.total_size, self._rate))
+
+    def _download_single(self, url):
+        with get_session().get(url, stream=True) as response:
+            response.raise_for_status()
+            self.total_size = int(response.headers.get('content-length', 0))
+
+            offset = 0
+            with open(self.destination, 'wb') as f:
+                for data in stream_chunks(response):
+                    f.write(data)
+                    self._hash(offset, data)
+                    offset += len(data)
+                    self._report(len(data))
+
+    def _download_range(self, url, rng):
+        while True:
+            try:
+                self._fetch_range(url, rng)
+                return
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+                if self._failed.is_set():
+                    raise
+                url = self._fail_over(url, e)
+                if not url:
+                    self._failed.set()
+                    raise
+            except Exception:
+                self._failed.set()
+                raise
+
+    def _fetch_range(self, url, rng):
+        start, end, done = rng
+        if start + done > end:
+            return
+
+        headers = {'Range': f'bytes={start + done}-{end}'}
+        if self.validator:
+            headers['If-Range'] = self.validator
+        # Closing the response hands its connection back to the pool
+        with get_session().get(url, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                if self.validator:
+                    raise RemoteChangedError(f"{self.url} changed during download")
+                raise IOError(f"Server ignored range request for bytes {start}-{end}")
+            content_range = response.headers.get('content-range', '')
+            if not content_range.startswith(f'bytes {start + done}-'):
+                raise IOError(f"Server sent {content_range or 'no range'} for bytes {start + done}-{end}")
+
+            # Unbuffered so the saved state never runs ahead of the data on disk
+            with open(self.destination, 'r+b', buffering=0) as f:
+                f.seek(start + done)
+                for data in stream_chunks(response):
+                    if self._failed.is_set():
+                        return
+                    f.write(data)
+                    offset = start + rng[2]
+                    rng[2] += len(data)
+                    self._hash(offset, data)
+                    self._report(len(data))
+                    self._save_state()
+
+        if start + rng[2] <= end:
+            raise IOError(f"Range {start}-{end} incomplete: got {rng[2]} of {end - start + 1} bytes")
+
+    def _load_state(self, remote):
+        """Return the saved ranges if they can be resumed against remote, else None"""
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if (state.get('url') != self.url
+                or state.get('size') != remote.size
+                or not remote.accepts_ranges
+                or not remote.validator
+                or state.get('validator') != remote.validator):
+            return None
+        try:
+            if os.path.getsize(self.destination) != remote.size:
+                return None
+        except OSError:
+            return None
+        return [list(rng) for rng in state['ranges']]
+
+    def _save_state(self, force=False):
+        if not self.ranges or not self.validator:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_save < STATE_SAVE_INTERVAL:
+                return
+            self._last_save = now
+            state = {
+                'url': self.url,
+                'size': self.total_size,
+                'validator': self.validator,
+                'ranges': [list(rng) for rng in self.ranges]
+            }
+            try:
+                temp_path = self.state_path + ".tmp"
+                with open(temp_path, 'w') as f:
+                    json.dump(state, f)
+                os.replace(temp_path, self.state_path)
+            except OSError as e:
+                print(f"Error: download state could not be saved: {e}")
+
+    def _remove_state(self):
+        if os.path.exists(self.state_path):
+            try:
+                os.remove(self.state_path)
+            except OSError as e:
+                print(f"Error: {self.state_path} could not be removed: {e}")
@@ -0,0 +1,563 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import threading
+
+import requests
+
+from downloader import DEFAULT_SEGMENTS, probe
+from extractor import PipelinedExtractor, extract_all
+from artifact_store import ArtifactStore
+from delta import DeltaUpgrade, read_manifest, record_install
+from catalog import CatalogCache, API_URL, host_platform, published_sha256
+from versions import (VERSIONS_DIR, version_path, current_path, is_installed, switch_version,
+                      rollback, rollback_tree, staging_path, verify_tree, commit_staged)
+from tracing import Tracer, TRACE_NAME
+from mirrors import configured_mirrors, mirror_url, rank_mirrors
+from paths import get_resource_path, DEFAULT_INSTALL_PATH
+
+def link_or_copy(source, target):
+    """Hard link source to target, copying it where the filesystem can't link"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+def resolve_version(version="latest", url=API_URL, platform=None, arch=None):
+    """Return the VersionInfo for a release tag, "latest" or a series like "latest 0.1.x".
+
+    With platform, only releases publishing an asset for platform and arch
+    are considered.
+    """
+    cache = CatalogCache(url)
+    versions = cache.load()
+    if not cache.fresh:
+        try:
+            versions = cache.refresh() or versions
+        except requests.RequestException as e:
+            # Offline or rate limited, a stale catalog still names every release
+            if not versions:
+                raise
+            print(f"Error: release catalog could not be revalidated: {e}")
+
+    if not versions:
+        raise LookupError("Could not load Jule versions!")
+    return cache.index().find(version, platform, arch)
+
+class PostInstallSteps:
+    """OS integration run once the files are in place, does nothing by default"""
+
+    def __init__(self, install_path, on_error):
+        self.install_path = install_path
+        self.on_error = on_error
+
+    def add_to_system_path(self):
+        pass
+
+    def setup_registry_entries(self):
+        pass
+
+    def create_shortcuts(self):
+        pass
+
+    def cleanup_temp_files(self):
+        pass
+
+class WindowsSteps(PostInstallSteps):
+    def setup_registry_entries(self):
+        """Setup Windows registry entries for Control Panel"""
+        import winreg
+        try:
+            # Registry path for installed programs
+            reg_path = r"Software\Microsoft\Windows\CurrentVersion\Uninstall\JuleLang"
+
+            # Create registry key
+            key = winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER, reg_path, 0, winreg.KEY_WRITE)
+
+            # Set registry values
+            winreg.SetValueEx(key, "DisplayName", 0, winreg.REG_SZ, "Jule Programming Language")
+            winreg.SetValueEx(key, "DisplayVersion", 0, winreg.REG_SZ, "1.0.0")
+            winreg.SetValueEx(key, "Publisher", 0, winreg.REG_SZ, "Jule Development Team")
+            winreg.SetValueEx(key, "InstallLocation", 0, winreg.REG_SZ, self.install_path)
+            winreg.SetValueEx(key, "DisplayIcon", 0, winreg.REG_SZ, os.path.join(self.install_path, "logo.png"))
+
+            # Close registry key
+            winreg.CloseKey(key)
+        except Exception as e:
+            self.on_error(f"Failed to create registry entries: {str(e)}")
+
+    def cleanup_temp_files(self):
+        """Clean up temporary files after installation"""
+        try:
+            # Files to remove
+            files_to_remove = [
+                "jule_idle.py",
+                "jule_interpreter.py",
+                "logo.png"
+            ]
+
+            for file in files_to_remove:
+                file_path = os.path.join(os.path.dirname(__file__), file)
+                if os.path.exists(file_path):
+                    try:
+                        os.remove(file_path)
+                    except Exception as e:
+                        print(f"Error: {file} could not be removed: {e}")
+        except Exception as e:
+            print(f"Error during cleanup: {e}")
+
+    def add_to_system_path(self):
+        import winreg
+        try:
+            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER,
+                               "Environment",
+                               0,
+                               winreg.KEY_ALL_ACCESS)
+
+            try:
+                current_path = winreg.QueryValueEx(key, "Path")[0]
+            except FileNotFoundError:
+                current_path = ""
+            entries = [entry for entry in current_path.split(";") if entry]
+
+            # The entry points at the stable current link, add it only once
+            wanted = os.path.normcase(os.path.normpath(self.install_path))
+            if not any(os.path.normcase(os.path.normpath(entry)) == wanted for entry in entries):
+                new_path = ";".join(entries + [self.install_path])
+                winreg.SetValueEx(key, "Path", 0, winreg.REG_EXPAND_SZ, new_path)
+            winreg.CloseKey(key)
+        except Exception as e:
+            self.on_error(f"Error setting PATH: {str(e)}")
+
+    def create_shortcuts(self):
+        """Create desktop shortcuts for Jule"""
+        try:
+            from shortcut import create_shortcut
+
+            # Create Jule Interpreter shortcut
+            jule_exe = os.path.join(self.install_path, "jule.exe")
+            if os.path.exists(jule_exe):
+                create_shortcut(
+                    jule_exe,
+                    "Jule Interpreter",
+                    icon_path=jule_exe,
+                    description="Jule Programming Language Interpreter"
+                )
+
+            # Create IDLE Jule shortcut, when the release ships the IDLE script
+            idle_script = os.path.join(self.install_path, "jule_idle.py")
+            if os.path.exists(idle_script):
+                create_shortcut(
+                    sys.executable,
+                    "IDLE Jule",
+                    arguments=f'"{idle_script}"',
+                    icon_path=get_resource_path("logo.png"),
+                    description="Jule Integrated Development Environment"
+                )
+        except Exception as e:
+            self.on_error(f"Failed to create shortcuts: {str(e)}")
+
+def default_steps():
+    return WindowsSteps if sys.platform == "win32" else PostInstallSteps
+
+class InstallEngine:
+    """Download, extract and integrate a Jule release without any GUI.
+
+    Progress is reported through plain callbacks: on_progress(percent,
+    bytes_per_second, eta), with a rate of 0 and an eta of -1 outside the
+    download, on_status(text) and on_error(text) for steps that fail without
+    stopping the install. Fatal errors are raised from run().
+
+    Downloads are checked against sha256, or else against the digest the
+    release in the cached catalog publishes for url. A delta upgrade only
+    fetches changed members, which are checked by their CRC32, so the
+    published digest is enforced on full downloads only; an explicit
+    sha256 always forces a full, verified download.
+
+    With a version tag, install_path is a root holding every installed
+    release in versions/<tag> and a current link to the active one, which
+    PATH and the shortcuts use. Installing a tag that is already there
+    only moves the link.
+
+    mirrors are base URLs serving the same assets as <base>/<tag>/<asset>,
+    JULE_MIRRORS is used when none are given. They are probed together
+    with url and the download starts on the fastest, failing over to the
+    next when a connection breaks off.
+
+    Files are extracted into a staging directory beside install_path and
+    checked against the install manifest before being renamed into place,
+    so a failed or interrupted install leaves the working one untouched.
+    Without a version tag the replaced tree is kept as install_path.previous.
+
+    Every phase is timed and a Chrome trace-event file is written to
+    trace_path, by default into install_path, whether or not run()
+    succeeds.
+    """
+
+    # Share of the progress bar taken by each phase, download and
+    # extraction overlap so both move the bar at the same time
+    PHASE_WEIGHTS = {
+        "download": 40,
+        "extract": 50,
+        "path": 2,
+        "registry": 2,
+        "shortcuts": 4,
+        "cleanup": 2
+    }
+
+    def __init__(self, url, install_path, add_to_path=True, segments=DEFAULT_SEGMENTS,
+                 steps=None, on_progress=None, on_status=None, on_error=None, sha256=None,
+                 api_url=API_URL, version=None, tracer=None, trace_path=None,
+                 mirrors=None):
+        self.url = url
+        self.mirrors = configured_mirrors() if mirrors is None else mirrors
+        self.sha256 = sha256
+        self.api_url = api_url
+        self.version = version
+        self.root = install_path
+        if version:
+            self.install_path = version_path(install_path, version)
+            integration_path = current_path(install_path)
+        else:
+            self.install_path = install_path
+            integration_path = install_path
+        self.staging_path = staging_path(self.install_path)
+        self.add_to_path = add_to_path
+        self.segments = segments
+        self.on_progress = on_progress or (lambda percent, bytes_per_second, eta: None)
+        self.on_status = on_status or (lambda text: None)
+        self.on_error = on_error or (lambda text: None)
+        self.tracer = tracer or Tracer()
+        self.trace_path = trace_path or os.path.join(install_path, TRACE_NAME)
+        self.steps = (steps or default_steps())(integration_path, self.report_error)
+        self.phase_progress = dict.fromkeys(self.PHASE_WEIGHTS, 0.0)
+        self.status_text = ""
+        self.bytes_per_second = 0
+        self.eta = -1
+        self.extracted_files = 0
+        self.extracted_bytes = 0
+        self._extract_started = self._extract_finished = None
+        self._last_percent = -1
+        self._lock = threading.Lock()
+
+    def run(self):
+        try:
+            with self.tracer.span("install", url=self.url, version=self.version):
+                self._install()
+        finally:
+            self.tracer.write(self.trace_path)
+
+    def _install(self):
+        tracer = self.tracer
+        if self.version and is_installed(self.root, self.version):
+            # Already on disk, PATH and shortcuts follow the link
+            self.begin_phase(f"Switching to Jule {self.version}...")
+            with tracer.span("switch"):
+                switch_version(self.root, self.version)
+            for phase in self.PHASE_WEIGHTS:
+                self.report(phase, 1)
+            self.on_status(f"Switched to Jule {self.version}")
+            return
+
+        # Everything is written to staging and moved in once verified, a failure
+        # or interruption before that leaves the working install as it was
+        staging = self.staging_path
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            self.stage()
+            with tracer.span("verify"):
+                verify_tree(staging)
+            # A single rename when nothing was installed at install_path yet
+            with tracer.span("commit"):
+                commit_staged(self.install_path)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.bytes_per_second, self.eta = 0, -1
+        self.report("download", 1)
+        self.report("extract", 1)
+
+        if self.version:
+            with tracer.span("switch"):
+                switch_version(self.root, self.version)
+
+        # Add to PATH (if requested)
+        if self.add_to_path:
+            self.begin_phase("Updating system PATH...")
+            with tracer.span("path"):
+                self.steps.add_to_system_path()
+        self.report("path", 1)
+
+        # Setup registry entries
+        self.begin_phase("Creating registry entries...")
+        with tracer.span("registry"):
+            self.steps.setup_registry_entries()
+        self.report("registry", 1)
+
+        # Create shortcuts
+        self.begin_phase("Creating shortcuts...")
+        with tracer.span("shortcuts"):
+            self.steps.create_shortcuts()
+        self.report("shortcuts", 1)
+
+        # Clean up temporary files
+        self.begin_phase("Cleaning up...")
+        with tracer.span("cleanup"):
+            self.steps.cleanup_temp_files()
+        self.report("cleanup", 1)
+
+        self.on_status("Installation completed successfully!")
+
+    def stage(self):
+        """Install the release into staging_path, from the store, by delta or by download"""
+        store = ArtifactStore()
+        with self.tracer.span("catalog") as span:
+            expected_sha256 = self.expected_sha256()
+            span["checksum_published"] = expected_sha256 is not None
+        cached_zip = store.lookup(self.url, sha256=expected_sha256)
+        if cached_zip:
+            # Same asset was downloaded before, no network needed
+            self.begin_phase("Extracting cached download...")
+            self.report("download", 1)
+            with self.tracer.span("extract", source="store") as span:
+                extract_all(cached_zip, self.staging_path, on_member=self.on_member_extracted)
+                record_install(self.staging_path, cached_zip, self.url)
+                span.update(files=self.extracted_files, bytes=self.extracted_bytes)
+        # An explicit digest can't be checked against a delta, so it always gets a full download
+        elif self.sha256 or not self.upgrade_in_place():
+            zip_path = store.partial_path(self.url)
+            self.begin_phase("Downloading...")
+            # Members are extracted while later bytes are still arriving
+            pipeline = PipelinedExtractor(
+                self.url,
+                zip_path,
+                self.staging_path,
+                segments=self.segments,
+                on_progress=self.on_download_progress,
+                on_member=self.on_member_extracted,
+                sha256=expected_sha256,
+                mirrors=self.download_urls()
+            )
+            with self.tracer.span("download_and_extract") as span:
+                try:
+                    pipeline.run()
+                finally:
+                    self.trace_pipeline(pipeline)
+                span.update(files=self.extracted_files, bytes=self.extracted_bytes)
+
+            # Keep the downloaded zip for reinstalls and repairs
+            with self.tracer.span("store"):
+                zip_path = store.add(self.url, zip_path, sha256=pipeline.sha256)
+                record_install(self.staging_path, zip_path, self.url)
+
+    def download_urls(self):
+        """Return url and its mirrors, fastest first, or None without mirrors"""
+        if not self.mirrors:
+            return None
+        self.begin_phase("Finding the fastest mirror...")
+        urls = [self.url] + [mirror_url(base, self.url) for base in self.mirrors]
+        with self.tracer.span("mirrors") as span:
+            probes = rank_mirrors(urls)
+            span["ranking"] = [probe.as_dict() for probe in probes]
+        if probes:
+            self.begin_phase(f"Downloading from {probes[0].url}...")
+        return [probe.url for probe in probes] or None
+
+    def trace_pipeline(self, pipeline):
+        """Record the overlapping download and extraction as spans on their own tracks"""
+        downloader = pipeline.downloader
+        if pipeline.download_started and pipeline.download_finished:
+            self.tracer.add(
+                "download",
+                pipeline.download_started,
+                pipeline.download_finished,
+                track="download",
+                bytes=downloader.downloaded - downloader.resumed_bytes,
+                resumed_bytes=downloader.resumed_bytes,
+                repaired_bytes=downloader.repaired_bytes,
+                segments=len(downloader.ranges) or 1,
+                url=downloader.current_url
+            )
+        if self._extract_started:
+            # From the first to the last member written
+            self.tracer.add(
+                "extract",
+                self._extract_started,
+                self._extract_finished,
+                track="extract",
+                files=self.extracted_files,
+                bytes=self.extracted_bytes
+            )
+
+    def expected_sha256(self):
+        """Return the SHA-256 the download must have, or None if none is published"""
+        if self.sha256:
+            return self.sha256
+        # The digest of this asset, not of the release's Windows installer
+        asset = CatalogCache(self.api_url).find_asset(self.url)
+        return published_sha256(asset) if asset else None
+
+    def upgrade_in_place(self):
+        """Fetch only the changed files on top of links to the active install, False if not possible"""
+        source = current_path(self.root) if self.version else self.install_path
+        if not read_manifest(source):
+            return False
+        # Checked before seeding staging, which is wasted if no delta is possible
+        try:
+            with self.tracer.span("probe"):
+                remote = probe(self.url)
+        except Exception as e:
+            print(f"Error: could not probe {self.url}: {e}")
+            return False
+        if not (remote.accepts_ranges and remote.size):
+            return False
+        self.seed_staging(source)
+        self.begin_phase("Upgrading changed files...")
+        self.report("download", 1)
+        try:
+            with self.tracer.span("delta") as span:
+                upgrade = DeltaUpgrade(self.url, self.staging_path,
+                                       on_member=self.on_member_extracted, remote=remote)
+                upgrade.run()
+                span.update(changed=upgrade.changed, removed=upgrade.removed,
+                            fetched_bytes=upgrade.fetched_bytes)
+            return True
+        except Exception as e:
+            print(f"Error: delta upgrade failed, downloading full archive: {e}")
+            # Files only the copied version has would be left behind
+            shutil.rmtree(self.staging_path, ignore_errors=True)
+            os.makedirs(self.staging_path, exist_ok=True)
+            self.report("download", 0)
+            return False
+
+    def seed_staging(self, source):
+        """Hard link the active install into staging so a delta upgrade can start from it.
+
+        The delta replaces each file it changes with a new one, so nothing
+        is written through the links into the active install.
+        """
+        self.begin_phase("Linking the current version...")
+        with self.tracer.span("seed"):
+            shutil.copytree(source, self.staging_path, copy_function=link_or_copy,
+                            dirs_exist_ok=True)
+
+    def begin_phase(self, text):
+        with self._lock:
+            self.status_text = text
+            self.on_status(text)
+
+    def report(self, phase, fraction, force=False):
+        """Update one phase and report the weighted total when it changes"""
+        with self._lock:
+            self.phase_progress[phase] = fraction
+            percent = int(sum(self.PHASE_WEIGHTS[name] * value
+                              for name, value in self.phase_progress.items()))
+            if percent != self._last_percent or force:
+                self._last_percent = percent
+                self.on_progress(percent, self.bytes_per_second, self.eta)
+                self.on_status(f"{self.status_text} {percent}%")
+
+    def on_download_progress(self, progress):
+        # The downloader already throttles, pass timed updates on for the rate
+        self.bytes_per_second = progress.bytes_per_second
+        self.eta = progress.eta
+        self.report("download", progress.percent / 100, force=True)
+
+    def report_error(self, text):
+        self.tracer.instant("error", message=text)
+        self.on_error(text)
+
+    def on_member_extracted(self, info, extracted_bytes, total_bytes):
+        now = time.perf_counter()
+        if self._extract_started is None:
+            self._extract_started = now
+        self._extract_finished = now
+        self.extracted_files += 1
+        self.extracted_bytes += info.file_size
+        self.status_text = f"Extracting {info.filename}..."
+        self.report("extract", extracted_bytes / total_bytes if total_bytes else 1)
+
+def main(argv=None):
+    """Unattended install, never imports PyQt5"""
+    parser = argparse.ArgumentParser(description="Install Jule without the setup wizard")
+    parser.add_argument("--headless", action="store_true", help="run without the GUI")
+    parser.add_argument("--version", default="latest",
+                        help='release tag, "latest" or a series like "latest 0.1.x"')
+    parser.add_argument("--platform", default="-".join(filter(None, host_platform())),
+                        help="asset to install as <os>-<arch>, e.g. linux-arm64, "
+                             "default this machine's")
+    parser.add_argument("--path", default=DEFAULT_INSTALL_PATH,
+                        help="installation root, releases go into versions/<tag>")
+    parser.add_argument("--no-path", action="store_true", help="don't add Jule to PATH")
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS,
+                        help="parallel connections per download")
+    parser.add_argument("--api-url", default=API_URL, help="releases API endpoint")
+    parser.add_argument("--sha256", help="expected SHA-256 of the release archive, "
+                                         "skips delta upgrades so it is always checked")
+    parser.add_argument("--mirror", action="append",
+                        help="mirror base URL serving <tag>/<asset>, may be repeated")
+    parser.add_argument("--rollback", action="store_true",
+                        help="switch back to the version active before the last install, "
+                             "or to the tree a plain install replaced")
+    parser.add_argument("--trace", help="where to write the install trace, "
+                                        f"default {TRACE_NAME} in the installation root")
+    args = parser.parse_args(argv)
+
+    errors = []
+
+    def on_error(text):
+        errors.append(text)
+        print(f"Error: {text}", file=sys.stderr)
+
+    if args.rollback:
+        try:
+            if os.path.isdir(os.path.join(args.path, VERSIONS_DIR)):
+                print(f"Rolled back to Jule {rollback(args.path)}")
+            else:
+                # Installed without a version tag, the replaced tree was kept beside it
+                rollback_tree(args.path)
+                print(f"Rolled back {args.path} to the install it replaced")
+        except Exception as e:
+            print(f"Error during rollback: {str(e)}", file=sys.stderr)
+            return 1
+        return 0
+
+    tracer = Tracer()
+    try:
+        platform, _, arch = args.platform.partition("-")
+        if not args.version.startswith("latest") and is_installed(args.path, args.version):
+            # Switching between installed versions needs no catalog or network
+            tag, url = args.version, None
+        else:
+            with tracer.span("catalog", version=args.version, platform=args.platform):
+                version = resolve_version(args.version, args.api_url, platform, arch or None)
+                asset = version.asset_for(platform, arch or None)
+            tag, url = version.version, asset.download_url
+            print(f"Installing Jule {tag} into {args.path}")
+        InstallEngine(
+            url,
+            args.path,
+            add_to_path=not args.no_path,
+            segments=args.segments,
+            on_status=print,
+            on_error=on_error,
+            # Only the user's digest, the engine looks up the published one itself
+            sha256=args.sha256,
+            api_url=args.api_url,
+            version=tag,
+            tracer=tracer,
+            trace_path=args.trace,
+            mirrors=args.mirror
+        ).run()
+    except Exception as e:
+        print(f"Error during installation: {str(e)}", file=sys.stderr)
+        # The engine writes its own trace, this covers failures before it ran
+        tracer.write(args.trace or os.path.join(args.path, TRACE_NAME))
+        return 1
+    return 2 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
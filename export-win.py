@@ -1,8 +1,125 @@
 import os
+import re
 import sys
-import shutil
+import ast
+import json
+import hashlib
+import argparse
+import threading
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+BUILD_DIR = "build"  # One work and spec directory per target, kept so rebuilds are incremental
+DIST_DIR = "dist"
+BUILD_STATE = "jule-build.json"
+# Files that change the build without being named in the PyInstaller arguments
+EXTRA_INPUTS = ['requirements.txt']
+# PyInstaller resolves these from the spec directory, so they are passed as absolute paths
+PATH_OPTIONS = ('--add-data=', '--add-binary=', '--icon=', '--version-file=')
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)  # PyInstaller builds running at once
+DEPENDENCY_STATE = os.path.join(BUILD_DIR, "jule-deps.json")
+
+# main.py, requirements.txt ve export-win.py'den gelen tüm bağımlılıklar
+DEPENDENCIES = [
+    'requests',
+    'pywin32',
+    'winshell',
+    'PyQt5',
+    'pyinstaller'  # export-win.py'nin kendisi için
+]
+
+PYQT5_ARGS = [
+    "--collect-all=PyQt5",  # Collect all PyQt5 modules
+    "--hidden-import=PyQt5.QtCore",
+    "--hidden-import=PyQt5.QtGui",
+    "--hidden-import=PyQt5.QtWidgets",
+    "--hidden-import=PyQt5.sip"
+]
+
+class BuildTarget:
+    """One executable built by PyInstaller in its own work and spec directory"""
+
+    def __init__(self, name, script, args):
+        self.name = name
+        self.script = script
+        self.args = args
+        self.workpath = os.path.join(BUILD_DIR, name)
+        self.state_path = os.path.join(self.workpath, BUILD_STATE)
+        self.artifact = os.path.join(DIST_DIR, name + ".exe")
+        self.key = None
+        self.status = "pending"
+        self.seconds = 0
+
+    def key_args(self):
+        return [f"--name={self.name}"] + self.args + [self.script]
+
+    def command(self):
+        args = []
+        for arg in self.args:
+            option = next((option for option in PATH_OPTIONS if arg.startswith(option)), None)
+            if option:
+                arg = option + os.path.abspath(arg[len(option):])
+            args.append(arg)
+        return [sys.executable, "-m", "PyInstaller", "--noconfirm",
+                f"--name={self.name}",
+                f"--workpath={self.workpath}",
+                f"--specpath={self.workpath}",
+                f"--distpath={DIST_DIR}"] + args + [os.path.abspath(self.script)]
+
+    def up_to_date(self):
+        """Return True if artifact was built from the current inputs and is unchanged"""
+        self.key = build_key(self.key_args())
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('key') == self.key and \
+                    file_sha256(self.artifact) == state.get('artifact_sha256'):
+                self.status = "cached"
+                self.seconds = state.get('seconds', 0)
+                return True
+        except (OSError, ValueError):
+            pass
+        return False
+
+    def record(self):
+        try:
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'key': self.key,
+                    'artifact_sha256': file_sha256(self.artifact),
+                    'seconds': round(self.seconds, 1)
+                }, f)
+        except OSError as e:
+            print_error(f"\nError recording build cache for {self.name}: {e}")
+
+INSTALLER = BuildTarget("Jule", "main.py", [
+    "--onefile",
+    "--noconsole",
+    "--icon=logo.ico",
+    "--add-data=logo.png;.",
+    "--add-data=uninstall.py;.",
+    "--add-binary=logo.ico;.",
+    "--add-binary=logo.png;.",  # Also add logo as binary
+    *PYQT5_ARGS,
+    "--version-file=version.txt",
+    "--uac-admin"
+])
+
+UNINSTALLER = BuildTarget("uninstall", "uninstall.py", [
+    "--onefile",
+    "--noconsole",
+    "--icon=logo.ico",
+    "--add-data=logo.png;.",
+    "--add-binary=logo.png;.",
+    *PYQT5_ARGS,
+    "--version-file=version.txt",
+    "--uac-admin"
+])
+
+TARGETS = [INSTALLER, UNINSTALLER]
+
+_output_lock = threading.Lock()
 
 # ANSI codes for colored output
 class Colors:
@@ -23,100 +140,125 @@ def print_error(msg):
 def print_info(msg):
     print_status(msg, Colors.YELLOW)
 
-def install_package(package):
-    print_info(f"\nChecking: {package}...")
-    try:
-        __import__(package)
-        print_success(f"{package} is already installed.")
-        return True
-    except ImportError:
-        print_info(f"{package} is being installed...")
-        try:
-            subprocess.run(
-                [sys.executable, "-m", "pip", "install", package],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            print_success(f"{package} installed successfully.")
-            return True
-        except subprocess.CalledProcessError as e:
-            print_error(f"Error installing {package}: {e.stderr}")
-            return False
+def normalize_name(name):
+    """Distribution names compare case-insensitively with -, _ and . treated alike"""
+    return re.sub(r"[-_.]+", "-", name).lower()
 
-def check_dependencies():
-    print_info("\nChecking required libraries...")
-    # main.py, requirements.txt ve export-win.py'den gelen tüm bağımlılıklar
-    dependencies = [
-        'requests',
-        'pywin32',
-        'winshell',
-        'PyQt5',
-        'pyinstaller'  # export-win.py'nin kendisi için
-    ]
-    
+def read_requirements(dependencies):
+    """Return {normalized name: requirement} for dependencies plus requirements.txt.
+
+    Pins in requirements.txt win over the bare names in dependencies.
+    """
+    requirements = {normalize_name(name): name for name in dependencies}
     # requirements.txt dosyasını oku ve bağımlılıklara ekle
     try:
         with open('requirements.txt', 'r') as f:
             for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    # Sürüm belirtimlerini kaldır (örn: PyQt5==5.15.9 -> PyQt5)
-                    package_name = line.split('==')[0].split('>=')[0].split('<=')[0].split('!=')[0].split('~=')[0]
-                    if package_name not in dependencies:
-                        dependencies.append(package_name)
+                line = line.split('#')[0].strip()
+                if line:
+                    # Sürüm belirtimini ayır (örn: PyQt5==5.15.9 -> PyQt5)
+                    package_name = re.split(r"[<>=!~;\[ ]", line, 1)[0]
+                    requirements[normalize_name(package_name)] = line
     except FileNotFoundError:
-        print_warning("requirements.txt not found. Skipping additional dependency checks from this file.")
+        print_info("requirements.txt not found. Skipping additional dependency checks from this file.")
     except Exception as e:
-        print_warning(f"Error reading requirements.txt: {e}")
+        print_error(f"Error reading requirements.txt: {e}")
+    return requirements
 
-    all_installed = True
-    for dep in list(set(dependencies)): # Benzersiz bağımlılıklar için listeyi kopyala
-        if not install_package(dep):
-            all_installed = False
-    return all_installed
+def installed_distributions():
+    """Return {normalized name: version} of the environment, in one pass over sys.path"""
+    from importlib.metadata import distributions
+    installed = {}
+    for dist in distributions():
+        name = dist.metadata['Name']
+        if name:
+            # The first one on sys.path is the one that gets imported
+            installed.setdefault(normalize_name(name), dist.version)
+    return installed
 
-def build_uninstaller():
-    """Build the uninstaller"""
+def unsatisfied(requirements, installed):
+    """Return the requirements that are missing or installed at a different pinned version.
+
+    Only == pins are compared, other specifiers just need the distribution.
+    """
+    missing = []
+    for name, requirement in requirements.items():
+        version = installed.get(name)
+        pin = re.search(r"==\s*([^\s;,]+)", requirement)
+        if version is None or (pin and version != pin.group(1)):
+            missing.append(requirement)
+    return missing
+
+def environment_fingerprint(requirements):
+    """Hash of the interpreter, the requirements and the state of its package directories"""
+    digest = hashlib.sha256()
+    for part in [sys.executable, sys.version] + sorted(requirements.values()):
+        digest.update(part.encode('utf-8') + b'\0')
+    # Installing or removing a distribution changes its package directory
+    for path in sys.path:
+        try:
+            digest.update(f"{path}:{os.stat(path).st_mtime_ns}".encode('utf-8') + b'\0')
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+def read_fingerprint():
     try:
-        print_info("\nBuilding uninstaller...")
-        show_spinner(1)
-        
-        # Build uninstaller with PyInstaller
-        result = subprocess.run(
-            [sys.executable, "-m", "PyInstaller",
-             "--name=uninstall",
-             "--onefile",
-             "--noconsole",
-             "--icon=logo.ico",
-             "--add-data=logo.png;.",
-             "--add-binary=logo.png;.",
-             "--collect-all=PyQt5",
-             "--hidden-import=PyQt5.QtCore",
-             "--hidden-import=PyQt5.QtGui",
-             "--hidden-import=PyQt5.QtWidgets",
-             "--hidden-import=PyQt5.sip",
-             "--version-file=version.txt",
-             "--uac-admin",
-             "--clean",
-             "uninstall.py"],
+        with open(DEPENDENCY_STATE, 'r', encoding='utf-8') as f:
+            return json.load(f).get('fingerprint')
+    except (OSError, ValueError):
+        return None
+
+def write_fingerprint(fingerprint):
+    try:
+        os.makedirs(BUILD_DIR, exist_ok=True)
+        with open(DEPENDENCY_STATE, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint}, f)
+    except OSError as e:
+        print_error(f"Error recording dependency check: {e}")
+
+def install_packages(requirements):
+    """Install all requirements with a single pip run"""
+    print_info(f"Installing {', '.join(requirements)}...")
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "pip", "install"] + requirements,
+            check=True,
             capture_output=True,
             text=True
         )
-        
-        if result.returncode != 0:
-            print_error(f"\nError building uninstaller:\n{result.stderr}")
-            return False
-        
-        # Cleanup
-        if os.path.exists('uninstall.spec'):
-            os.remove('uninstall.spec')
-        
+        print_success("Packages installed successfully.")
         return True
-        
-    except Exception as e:
-        print_error(f"\nError building uninstaller: {str(e)}")
+    except subprocess.CalledProcessError as e:
+        print_error(f"Error installing packages: {e.stderr}")
+        return False
+
+def check_dependencies():
+    print_info("\nChecking required libraries...")
+    requirements = read_requirements(DEPENDENCIES)
+    fingerprint = environment_fingerprint(requirements)
+    if fingerprint == read_fingerprint():
+        print_success("Environment unchanged since the last successful check.")
+        return True
+
+    # Distribution lookups, nothing is imported
+    missing = unsatisfied(requirements, installed_distributions())
+    if not missing:
+        print_success("All required libraries are installed.")
+    elif not install_packages(missing):
         return False
+    else:
+        missing = unsatisfied(requirements, installed_distributions())
+        if missing:
+            print_error(f"Still not satisfied after installing: {', '.join(missing)}")
+            return False
+    # pip changed the package directories, so fingerprint the result
+    write_fingerprint(environment_fingerprint(requirements))
+    return True
+
+def build_uninstaller():
+    """Build the uninstaller"""
+    return build_targets([UNINSTALLER])
 
 def check_requirements():
     # Check required files
@@ -150,148 +292,170 @@ def check_requirements():
     
     return True
 
-def show_spinner(duration):
-    chars = "-\|/"
-    start_time = time.time()
-    i = 0
-    while time.time() - start_time < duration:
-        sys.stdout.write(f'\r{chars[i]} ')
-        sys.stdout.flush()
-        time.sleep(0.1)
-        i = (i + 1) % len(chars)
-    sys.stdout.write('\r')
-    sys.stdout.flush()
+def local_modules(script):
+    """Return script and every module next to it that it imports, directly or not"""
+    found = []
+    pending = [script]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.append(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), path)
+        # Imports inside functions count, main.py loads most modules lazily
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = name.split('.')[0] + '.py'
+                if os.path.exists(module):
+                    pending.append(module)
+    return sorted(found)
 
-def export_installer():
+def build_inputs(args):
+    """Return every file the build reads: scripts, their local modules and data files"""
+    inputs = set(EXTRA_INPUTS)
+    for arg in args:
+        if arg.endswith('.py') and not arg.startswith('-'):
+            inputs.update(local_modules(arg))
+        for option in ('--add-data=', '--add-binary=', '--icon=', '--version-file='):
+            if arg.startswith(option):
+                inputs.add(arg[len(option):].split(';')[0])
+    return sorted(inputs)
+
+def pyinstaller_version():
     try:
-        # Show title
-        print("\n" + "=" * 50)
-        print_info("Jule Installer Export Tool")
-        print("=" * 50 + "\n")
-        
-        # Check requirements
-        print_info("\nChecking requirements...")
-        show_spinner(1)
-        if not check_requirements():
-            return
-        
-        # Build installer with PyInstaller
-        print_info("\nBuilding installer...")
-        show_spinner(1)
-        result = subprocess.run(
-            [sys.executable, "-m", "PyInstaller",
-             "--name=Jule",
-             "--onefile",
-             "--noconsole",
-             "--icon=logo.ico",
-             "--add-data=logo.png;.",
-             "--add-binary=logo.ico;.",
-             "--collect-all=PyQt5",
-             "--hidden-import=PyQt5.QtCore",
-             "--hidden-import=PyQt5.QtGui",
-             "--hidden-import=PyQt5.QtWidgets",
-             "--hidden-import=PyQt5.sip",
-             "--specpath=.",
-             "--version-file=version.txt",
-             "--uac-admin",
-             "--clean",
-             "main.py"],
-            capture_output=True,
-            text=True
+        from importlib.metadata import version
+        return version('pyinstaller')
+    except Exception:
+        return None
+
+def build_key(args):
+    """Hash of the build inputs, the arguments and the toolchain"""
+    digest = hashlib.sha256()
+    for part in [sys.version, str(pyinstaller_version())] + list(args):
+        digest.update(part.encode('utf-8') + b'\0')
+    for path in build_inputs(args):
+        digest.update(path.encode('utf-8') + b'\0')
+        try:
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            digest.update(b'missing')
+    return digest.hexdigest()
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def print_target(target, line):
+    # Whole lines under a lock, so concurrent builds don't interleave mid-line
+    with _output_lock:
+        print(f"[{target.name}] {line}", flush=True)
+
+def run_target(target):
+    """Run one PyInstaller build, streaming its output as it is written"""
+    os.makedirs(target.workpath, exist_ok=True)
+    start_time = time.time()
+    try:
+        process = subprocess.Popen(
+            target.command(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
         )
-        
-        if result.returncode != 0:
-            print_error(f"\nError occurred:\n{result.stderr}")
-            return
-        
-        # Cleanup
-        print_info("\nCleaning up...")
-        show_spinner(1)
-        # Removed temp_dir from cleanup as it's no longer created
-        for item in ['build', '__pycache__', 'main.spec']:
-            try:
-                if os.path.isdir(item):
-                    shutil.rmtree(item)
-                elif os.path.exists(item):
-                    os.remove(item)
-            except Exception as e:
-                print_error(f"\nError cleaning {item}: {e}")
-        
-        # Success message
-        print("\n" + "=" * 50)
-        print_success("Build completed successfully!")
-        print_success("Installer created in 'dist' folder.")
-        print("=" * 50 + "\n")
-        
+        for line in process.stdout:
+            print_target(target, line.rstrip())
+        process.wait()
     except Exception as e:
-        print_error(f"\nAn error occurred: {str(e)}")
+        print_target(target, f"Error starting PyInstaller: {e}")
+        target.status = "failed"
+        return False
+    target.seconds = time.time() - start_time
+    if process.returncode != 0:
+        print_target(target, f"PyInstaller exited with code {process.returncode}")
+        target.status = "failed"
+        return False
+    target.status = "built"
+    target.record()
+    return True
+
+def build_targets(targets, jobs=DEFAULT_JOBS):
+    """Build targets concurrently, at most jobs PyInstaller processes at a time"""
+    if not targets:
+        return True
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(targets)))) as executor:
+        return all(executor.map(run_target, targets))
+
+def print_summary(targets, wall_seconds):
+    print("\n" + "=" * 50)
+    for target in targets:
+        line = f"{target.name:<12} {target.status:<8} {target.seconds:7.1f}s"
+        if target.status == "cached":
+            print_success(line + " (last build)")
+        elif target.status == "built":
+            print_success(line)
+        else:
+            print_error(line)
+    built = sum(target.seconds for target in targets if target.status != "cached")
+    print_info(f"Wall time {wall_seconds:.1f}s, build time of all targets {built:.1f}s")
+    print("=" * 50 + "\n")
 
-def export_windows():
+def export_installer():
+    """Build only the installer"""
+    export_windows([INSTALLER])
+
+def export_windows(targets=TARGETS, jobs=DEFAULT_JOBS):
     try:
         # Show title
         print("\n" + "=" * 50)
         print_info("Jule Windows Export Tool")
         print("=" * 50 + "\n")
         
-        # Check dependencies
-        if not check_dependencies(): # Güncellenmiş fonksiyon çağrısı
-            print_error("\nRequired libraries could not be installed. Please install them manually.")
-            return
-        
         # Check required files
         print_info("\nChecking required files...")
-        show_spinner(1)
         if not check_requirements():
             return
+        start_time = time.time()
         
-        # Build with PyInstaller
-        print_info("\nPackaging application...")
-        show_spinner(1)
-        result = subprocess.run(
-            [sys.executable, "-m", "PyInstaller",
-             "--name=Jule",
-             "--onefile",
-             "--noconsole",
-             "--icon=logo.ico",
-             "--add-data=logo.png;.",
-             "--add-data=uninstall.py;.",
-             "--add-binary=logo.ico;.",
-             "--add-binary=logo.png;.",  # Also add logo as binary
-             "--collect-all=PyQt5",  # Collect all PyQt5 modules
-             "--hidden-import=PyQt5.QtCore",
-             "--hidden-import=PyQt5.QtGui",
-             "--hidden-import=PyQt5.QtWidgets",
-             "--hidden-import=PyQt5.sip",
-             "--specpath=.",
-             "--version-file=version.txt",
-             "--uac-admin",
-             "--clean",
-             "main.py"],
-            capture_output=True,
-            text=True
-        )
+        # Nothing to do for targets whose inputs match their last build
+        stale = []
+        for target in targets:
+            if target.up_to_date():
+                print_success(f"Build cache hit for {target.name} ({target.key[:12]}), "
+                              f"{target.artifact} is up to date.")
+            else:
+                print_info(f"Build cache miss for {target.name} ({target.key[:12]}).")
+                stale.append(target)
         
-        if result.returncode != 0:
-            print_error(f"\nError occurred:\n{result.stderr}")
-            return
+        if stale:
+            # Check dependencies
+            if not check_dependencies(): # Güncellenmiş fonksiyon çağrısı
+                print_error("\nRequired libraries could not be installed. Please install them manually.")
+                return
+            
+            print_info(f"\nBuilding {', '.join(target.name for target in stale)}...")
+            succeeded = build_targets(stale, jobs)
+        else:
+            succeeded = True
+        print_summary(targets, time.time() - start_time)
         
-        # Cleanup
-        print_info("\nCleaning up...")
-        show_spinner(1)
-        for item in ['build', '__pycache__', 'main.spec', 'uninstall.spec']:
-            try:
-                if os.path.isdir(item):
-                    shutil.rmtree(item)
-                elif os.path.exists(item):
-                    os.remove(item)
-            except Exception as e:
-                print_error(f"\nError cleaning {item}: {e}")
+        if not succeeded:
+            print_error("Build failed, see the output above.")
+            return
         
         # Success message
-        print("\n" + "=" * 50)
         print_success("Build completed successfully!")
-        print_success("Installer created in 'dist' folder.")
-        print("=" * 50 + "\n")
+        print_success(f"Executables are in the '{DIST_DIR}' folder.")
         
     except Exception as e:
         print_error(f"\nAn error occurred: {str(e)}")
@@ -301,8 +465,21 @@ if __name__ == "__main__":
         # Enable ANSI color codes for Windows
         os.system('')
         
+        parser = argparse.ArgumentParser(description="Build the Jule installer executables")
+        names = [target.name for target in TARGETS]
+        parser.add_argument("targets", nargs="*",
+                            help=f"targets to build, all by default: {', '.join(names)}")
+        parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                            help="PyInstaller builds to run at once")
+        args = parser.parse_args()
+        # Not choices=, argparse checks the empty default against them and rejects it
+        unknown = [name for name in args.targets if name not in names]
+        if unknown:
+            parser.error(f"unknown target {', '.join(unknown)}, choose from {', '.join(names)}")
+        
         # Start export process
-        export_windows() # Changed from export_installer()
+        export_windows([target for target in TARGETS
+                        if not args.targets or target.name in args.targets], args.jobs)
         
         # Wait for user input
         input("\nPress Enter to exit...")
@@ -311,11 +488,3 @@ if __name__ == "__main__":
         print_info("\n\nOperation cancelled.")
     except Exception as e:
         print_error(f"\nAn unexpected error occurred: {str(e)}")
-    finally:
-        # Cleanup
-        for file in ['main.spec', 'uninstall.spec']:
-            if os.path.exists(file):
-                try:
-                    os.remove(file)
-                except:
-                    pass
\ No newline at end of file
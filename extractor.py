@@ -0,0 +1,276 @@
+import os
+import shutil
+import zlib
+import time
+import struct
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from downloader import Downloader, RemoteChangedError, DEFAULT_SEGMENTS
+
+EOCD_SIGNATURE = b"PK\x05\x06"
+EOCD_FORMAT = "<4s4H2LH"
+EOCD_SIZE = struct.calcsize(EOCD_FORMAT)
+TAIL_SIZE = 256 * 1024  # End record plus the central directory of most archives
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+COPY_BUFFER = 256 * 1024
+
+def central_directory_offset(tail):
+    """Return the central directory offset from the last bytes of a zip, or None"""
+    pos = tail.rfind(EOCD_SIGNATURE)
+    if pos < 0 or pos + EOCD_SIZE > len(tail):
+        return None
+    offset = struct.unpack(EOCD_FORMAT, tail[pos:pos + EOCD_SIZE])[6]
+    if offset == 0xFFFFFFFF:
+        # Zip64, the real offset lives in another record
+        return None
+    return offset
+
+def member_extents(zip_ref, cd_offset):
+    """Yield (info, start, end) with the byte span of every member in the archive"""
+    infos = sorted(zip_ref.infolist(), key=lambda info: info.header_offset)
+    for i, info in enumerate(infos):
+        end = infos[i + 1].header_offset if i + 1 < len(infos) else cd_offset
+        yield info, info.header_offset, end
+
+def member_target(root, name):
+    """Return where member name belongs under root, rejecting paths that escape it"""
+    target = os.path.normpath(os.path.join(root, name))
+    try:
+        inside = os.path.commonpath([root, target]) == root
+    except ValueError:
+        # Different drives on Windows
+        inside = False
+    if not inside:
+        raise zipfile.BadZipFile(f"Unsafe path in archive: {name}")
+    return target
+
+class ParallelExtractor:
+    """Extract zip members on a bounded thread pool.
+
+    Every worker thread reads through its own ZipFile handle so members
+    inflate concurrently instead of serializing on one shared file. Member
+    CRCs are still checked by ZipFile.open while reading; a member that
+    fails is handed to on_bad_member, if given, and extracted once more.
+
+    With growing set the zip is still being downloaded, so the handles read
+    it unbuffered: a buffer filled past one member could otherwise serve the
+    next member's bytes as they were before they arrived.
+    """
+
+    def __init__(self, zip_path, extract_to, workers=DEFAULT_WORKERS, on_member=None,
+                 on_bad_member=None, growing=False):
+        self.zip_path = zip_path
+        self.growing = growing
+        self.extract_to = os.path.abspath(extract_to)
+        self.on_member = on_member
+        self.on_bad_member = on_bad_member
+        self.total_bytes = 0
+        self.extracted_bytes = 0
+        self._targets = {}
+        self._futures = []
+        self._handles = []
+        self._files = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def prepare(self, infos):
+        """Validate every member path and create all directories before any write"""
+        directories = set()
+        for info in infos:
+            target = member_target(self.extract_to, info.filename)
+            self._targets[info.filename] = target
+            self.total_bytes += info.file_size
+            directories.add(target if info.is_dir() else os.path.dirname(target))
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
+
+    def submit(self, info):
+        self._futures.append(self._executor.submit(self._extract, info))
+
+    def wait(self):
+        """Block until every submitted member is written, raising the first failure"""
+        for future in self._futures:
+            future.result()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+        # ZipFile leaves files it was handed open
+        for f in self._files:
+            f.close()
+        self._files = []
+
+    def _handle(self):
+        handle = getattr(self._local, 'handle', None)
+        if handle is None:
+            if self.growing:
+                f = open(self.zip_path, 'rb', buffering=0)
+                handle = zipfile.ZipFile(f, 'r')
+                with self._lock:
+                    self._files.append(f)
+            else:
+                handle = zipfile.ZipFile(self.zip_path, 'r')
+            self._local.handle = handle
+            with self._lock:
+                self._handles.append(handle)
+        return handle
+
+    def _extract(self, info):
+        if not info.is_dir():
+            try:
+                self._write(info)
+            except (zipfile.BadZipFile, zlib.error):
+                if not self.on_bad_member:
+                    raise
+                self.on_bad_member(info)
+                # The handle may have buffered the old bytes
+                self._local.handle.close()
+                self._local.handle = None
+                self._write(info)
+
+        with self._lock:
+            self.extracted_bytes += info.file_size
+            if self.on_member:
+                self.on_member(info, self.extracted_bytes, self.total_bytes)
+
+    def _write(self, info):
+        target = self._targets[info.filename]
+        with self._handle().open(info) as source, open(target, 'wb') as dest:
+            shutil.copyfileobj(source, dest, COPY_BUFFER)
+
+def extract_all(zip_path, extract_to, workers=DEFAULT_WORKERS, on_member=None):
+    """Parallel replacement for ZipFile.extractall"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        infos = zip_ref.infolist()
+    with ParallelExtractor(zip_path, extract_to, workers, on_member) as extractor:
+        extractor.prepare(infos)
+        for info in infos:
+            extractor.submit(info)
+        extractor.wait()
+
+class PipelinedExtractor:
+    """Download a zip and extract its members while later bytes are still arriving.
+
+    The central directory at the end of the archive is fetched first; every
+    member is then extracted as soon as its byte span is on disk. Servers
+    without range support degrade to download-then-extract.
+
+    A member failing its CRC32 check has only its own span downloaded
+    again. The SHA-256 of the whole archive is checked against sha256,
+    when given, once the download is complete, which is after every member
+    was written. extract_to must therefore be a throwaway staging directory,
+    discarded when run() raises ChecksumMismatch, never a live install. If
+    the archive changes on the server mid-download, extract_to is emptied
+    and the new archive is downloaded and extracted once more.
+    """
+
+    def __init__(self, url, zip_path, extract_to, segments=DEFAULT_SEGMENTS,
+                 workers=DEFAULT_WORKERS, on_progress=None, on_member=None, sha256=None,
+                 mirrors=None):
+        self.downloader = Downloader(
+            url,
+            zip_path,
+            segments=segments,
+            on_progress=on_progress,
+            tail_size=TAIL_SIZE,
+            mirrors=mirrors
+        )
+        self.zip_path = zip_path
+        self.extract_to = extract_to
+        self.workers = workers
+        self.on_member = on_member
+        self.expected_sha256 = sha256
+        self.sha256 = None
+        self.download_started = self.download_finished = None
+        self._extents = {}
+
+    def run(self):
+        try:
+            return self._run()
+        except RemoteChangedError as e:
+            # Members already written may be from the old archive, extract it all again
+            print(f"Error: {e}, downloading it again")
+            shutil.rmtree(self.extract_to, ignore_errors=True)
+            os.makedirs(self.extract_to, exist_ok=True)
+            return self._run()
+
+    def _run(self):
+        error = []
+
+        def download():
+            self.download_started = time.perf_counter()
+            try:
+                self.downloader.download()
+            except Exception as e:
+                error.append(e)
+            self.download_finished = time.perf_counter()
+
+        thread = threading.Thread(target=download, daemon=True)
+        thread.start()
+        try:
+            self._extract()
+        except Exception:
+            thread.join()
+            if error:
+                # Report the network failure rather than the wait it caused
+                raise error[0]
+            raise
+        thread.join()
+        if error:
+            raise error[0]
+        self.sha256 = self.downloader.verify(self.expected_sha256)
+        return self.zip_path
+
+    def _repair(self, info):
+        start, end = self._extents[info.filename]
+        print(f"Error: {info.filename} failed its CRC check, downloading it again")
+        self.downloader.refetch(start, end)
+
+    def _extract(self):
+        downloader = self.downloader
+        self.downloader.wait_started()
+
+        size = downloader.total_size
+        downloader.wait_for(max(0, size - TAIL_SIZE), size)
+        size = os.path.getsize(self.zip_path)
+        with open(self.zip_path, 'rb') as f:
+            f.seek(max(0, size - TAIL_SIZE))
+            cd_offset = central_directory_offset(f.read())
+        if cd_offset is None:
+            cd_offset = 0
+        downloader.wait_for(cd_offset, size)
+
+        with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
+            pending = list(member_extents(zip_ref, cd_offset))
+        self._extents = {info.filename: (start, end) for info, start, end in pending}
+
+        with ParallelExtractor(self.zip_path, self.extract_to, self.workers,
+                               self.on_member, self._repair, growing=True) as extractor:
+            extractor.prepare([item[0] for item in pending])
+            while pending:
+                with downloader.available:
+                    while True:
+                        ready = [item for item in pending
+                                 if downloader.covers(item[1], item[2])]
+                        if ready:
+                            break
+                        if downloader.error:
+                            raise IOError(f"Download failed: {downloader.error}")
+                        downloader.available.wait()
+
+                for item in ready:
+                    extractor.submit(item[0])
+                ready_ids = set(map(id, ready))
+                pending = [item for item in pending if id(item) not in ready_ids]
+            extractor.wait()
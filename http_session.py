@@ -0,0 +1,133 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+USER_AGENT = "jule-universal-installer"
+CONNECT_TIMEOUT = 10  # Seconds
+READ_TIMEOUT = 60  # Seconds between bytes, not for the whole body
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+POOL_SIZE = 16  # Enough for segmented downloads plus catalog requests
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class ConnectionStats:
+    """Counts requests and newly opened connections, the difference was reused"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def reused(self):
+        return max(0, self.requests - self.connections)
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "reused": self.reused
+        }
+
+def _counting_pool(base, stats):
+    # Count real connects, a dropped keep-alive connection reconnects in place
+    class CountingConnection(base.ConnectionCls):
+        def connect(self):
+            stats.count_connection()
+            return super().connect()
+
+    class CountingPool(base):
+        ConnectionCls = CountingConnection
+    return CountingPool
+
+class CountingAdapter(HTTPAdapter):
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def _count_connections(self, manager):
+        manager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self.stats),
+            "https": _counting_pool(HTTPSConnectionPool, self.stats)
+        }
+        return manager
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self._count_connections(self.poolmanager)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        new = proxy not in self.proxy_manager
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if new:
+            self._count_connections(manager)
+        return manager
+
+    def send(self, request, **kwargs):
+        self.stats.count_request()
+        return super().send(request, **kwargs)
+
+class InstallerSession(requests.Session):
+    """Keep-alive session with retries, default timeouts and connection counters"""
+
+    def __init__(self, retries=RETRIES, backoff_factor=BACKOFF_FACTOR,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), proxies=None,
+                 pool_size=POOL_SIZE):
+        super().__init__()
+        self.timeout = timeout
+        self.stats = ConnectionStats()
+        self.headers["User-Agent"] = USER_AGENT
+        if proxies:
+            self.proxies.update(proxies)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["HEAD", "GET"]),
+            # Hand the last response back so callers still see the status
+            raise_on_status=False
+        )
+        adapter = CountingAdapter(
+            self.stats,
+            max_retries=retry,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Return the session shared by every network stage of the installer"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = InstallerSession()
+        return _session
+
+def configure(**options):
+    """Replace the shared session, options are passed to InstallerSession"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = InstallerSession(**options)
+        return _session
@@ -1,83 +1,77 @@
 import sys
 import os
-import json
-import zipfile
-import requests
-import winreg
-import shutil
-import subprocess
-import win32gui
-import win32con
-import win32com.client
-import ctypes
-from datetime import datetime
-from shortcut import create_shortcut
+from collections import OrderedDict
+
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    # Unattended installs never load PyQt5 or pywin32
+    from engine import main as headless_main
+    sys.exit(headless_main(sys.argv[1:]))
+
+if __name__ == "__main__" and "--serve-cache" in sys.argv[1:]:
+    # Caches releases for installers on the LAN, no GUI either
+    from cache_server import main as cache_main
+    sys.exit(cache_main(sys.argv[1:]))
+
+# Only what is needed to paint WelcomePage is imported here. The network,
+# zip and Windows modules are imported by the threads that use them.
+from paths import get_resource_path, DEFAULT_INSTALL_PATH
 from PyQt5.QtWidgets import (QApplication, QWizard, QWizardPage, QLabel, 
                            QVBoxLayout, QCheckBox, QProgressBar, QLineEdit, 
                            QPushButton, QFileDialog, QComboBox, QHBoxLayout,
                            QScrollArea, QWidget, QMessageBox)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QPixmap, QFont, QIcon
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap, QIcon, QTextDocument
+
+# Set by benchmark.py startup to measure time to first paint
+STARTUP_PROBE = os.environ.get("JULE_STARTUP_PROBE")
+NOTES_CACHE_SIZE = 16  # Rendered release notes kept in memory
+NOTES_DEBOUNCE_MS = 150  # Quiet time before the selected release notes are rendered
 
 def is_admin():
     try:
+        import ctypes
         return ctypes.windll.shell32.IsUserAnAdmin()
     except:
         return False
 
-def get_resource_path(relative_path):
-    """Get absolute path to resource, works for dev and for PyInstaller"""
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(os.path.dirname(__file__))
-    
-    return os.path.join(base_path, relative_path)
-
-GITHUB_API_URL = "https://api.github.com/repos/julelang/jule/releases"
-DEFAULT_INSTALL_PATH = os.path.expanduser("~\\jule")
+class InstallThread(QThread):
+    """Run the install engine off the GUI thread"""
+    progress = pyqtSignal(int, float, float)  # Percent, bytes per second, ETA in seconds
+    status = pyqtSignal(str)
+    completed = pyqtSignal()
+    error = pyqtSignal(str)  # A step failed, the install goes on
+    failed = pyqtSignal(str)  # The install stopped
 
-class DownloadThread(QThread):
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(str)
-    error = pyqtSignal(str)
-
-    def __init__(self, url, destination):
+    def __init__(self, url, install_path, add_to_path, segments=None, version=None):
         super().__init__()
-        self.url = url
-        self.destination = destination
+        from engine import InstallEngine
+        from downloader import DEFAULT_SEGMENTS
+
+        self.engine = InstallEngine(
+            url,
+            install_path,
+            add_to_path=add_to_path,
+            segments=segments or DEFAULT_SEGMENTS,
+            on_progress=self.progress.emit,
+            on_status=self.status.emit,
+            on_error=self.error.emit,
+            version=version
+        )
 
     def run(self):
         try:
-            response = requests.get(self.url, stream=True)
-            total_size = int(response.headers.get('content-length', 0))
-            block_size = 1024
-            downloaded = 0
-
-            with open(self.destination, 'wb') as f:
-                for data in response.iter_content(block_size):
-                    downloaded += len(data)
-                    f.write(data)
-                    progress = int((downloaded / total_size) * 100)
-                    self.progress.emit(progress)
-            
-            self.finished.emit(self.destination)
+            self.engine.run()
+            self.completed.emit()
         except Exception as e:
-            self.error.emit(str(e))
-
-class VersionInfo:
-    def __init__(self, version, date, description, download_url):
-        self.version = version
-        self.date = date
-        self.description = description
-        self.download_url = download_url
+            self.failed.emit(f"Error during installation: {str(e)}\n"
+                             f"Details were written to {self.engine.trace_path}")
 
 class VersionSelectionPage(QWizardPage):
     def __init__(self):
         super().__init__()
         self.setTitle("Select Jule Version")
         self.versions = []
+        self.rendered_notes = OrderedDict()
         layout = QVBoxLayout()
         
         # Version selection combo box
@@ -112,12 +106,19 @@ class VersionSelectionPage(QWizardPage):
         self.info_layout.addWidget(desc_label)
         self.desc_text = QLabel()
         self.desc_text.setWordWrap(True)
-        self.desc_text.setTextFormat(Qt.MarkdownText)
+        # Markdown is converted once per release by render_notes
+        self.desc_text.setTextFormat(Qt.RichText)
         self.desc_text.setOpenExternalLinks(True)
         self.info_layout.addWidget(self.desc_text)
         
         info_scroll.setWidget(info_widget)
         layout.addWidget(info_scroll)
+
+        # Scrolling through the combo only renders where the user stops
+        self.notes_timer = QTimer(self)
+        self.notes_timer.setSingleShot(True)
+        self.notes_timer.setInterval(NOTES_DEBOUNCE_MS)
+        self.notes_timer.timeout.connect(self.render_notes)
         
         # Loading indicator
         self.loading_label = QLabel("Loading versions from GitHub...")
@@ -129,6 +130,8 @@ class VersionSelectionPage(QWizardPage):
         # Start loading versions
         self.load_versions_thread = LoadVersionsThread()
         self.load_versions_thread.versions_loaded.connect(self.on_versions_loaded)
+        self.load_versions_thread.versions_added.connect(self.on_versions_added)
+        self.load_versions_thread.finished.connect(self.on_load_finished)
         self.load_versions_thread.error.connect(self.on_load_error)
         self.load_versions_thread.start()
         
@@ -137,22 +140,46 @@ class VersionSelectionPage(QWizardPage):
         self.registerField("download_url*", self.version_combo, "currentData")
     
     def on_versions_loaded(self, versions):
+        # Called again when the cached catalog turns out to be stale
+        index = self.version_combo.currentIndex()
+        selected = self.versions[index].version if 0 <= index < len(self.versions) else None
         self.versions = versions
+        # Notes of a revalidated catalog may have been edited
+        self.rendered_notes.clear()
         self.loading_label.hide()
         
         if not versions:
             self.show_error("Could not load Jule versions!")
             return
         
+        self.version_combo.blockSignals(True)
+        self.version_combo.clear()
         for version in versions:
             self.version_combo.addItem(
                 f"Version {version.version}",
                 version.download_url
             )
+        self.version_combo.blockSignals(False)
         
-        # Select first version
-        self.version_combo.setCurrentIndex(0)
-        self.update_version_info(0)
+        # Keep the user's choice, otherwise select first version
+        index = next((i for i, version in enumerate(versions)
+                      if version.version == selected), 0)
+        self.version_combo.setCurrentIndex(index)
+        self.update_version_info(index)
+    
+    def on_versions_added(self, versions):
+        # Adding to an empty combo selects the first item, which shows its info
+        self.versions = self.versions + versions
+        for version in versions:
+            self.version_combo.addItem(
+                f"Version {version.version}",
+                version.download_url
+            )
+        self.loading_label.setText("Loading older versions from GitHub...")
+    
+    def on_load_finished(self):
+        if self.versions:
+            self.loading_label.hide()
     
     def on_load_error(self, error):
         error_msg = f"Error loading version information: {error}"
@@ -162,48 +189,70 @@ class VersionSelectionPage(QWizardPage):
     def show_error(self, message):
         QMessageBox.critical(self, "Error", message)
     
+    def selected_version(self):
+        index = self.version_combo.currentIndex()
+        return self.versions[index] if 0 <= index < len(self.versions) else None
+
     def update_version_info(self, index):
         if 0 <= index < len(self.versions):
             version = self.versions[index]
             self.date_value.setText(version.date)
-            self.desc_text.setText(version.description)
+            self.notes_timer.start()
+
+    def render_notes(self):
+        index = self.version_combo.currentIndex()
+        if not 0 <= index < len(self.versions):
+            return
+        version = self.versions[index]
+        html = self.rendered_notes.pop(version.version, None)
+        if html is None:
+            document = QTextDocument()
+            document.setMarkdown(version.notes())
+            html = document.toHtml()
+        # Most recently shown last, the oldest is dropped first
+        self.rendered_notes[version.version] = html
+        if len(self.rendered_notes) > NOTES_CACHE_SIZE:
+            self.rendered_notes.popitem(last=False)
+        self.desc_text.setText(html)
 
 class LoadVersionsThread(QThread):
     versions_loaded = pyqtSignal(list)
+    versions_added = pyqtSignal(list)
     error = pyqtSignal(str)
     
     def run(self):
+        # Imported here so requests loads off the GUI thread, after first paint
+        from catalog import CatalogCache, ReleaseCatalog, API_URL
+
+        def installable(versions):
+            # Releases with a Windows build, newest version first
+            return [info for info in ReleaseCatalog(versions).versions if info.download_url]
+
+        def on_page(page):
+            page = [info for info in page if info.download_url]
+            if page:
+                self.versions_added.emit(page)
+
+        cache = CatalogCache(API_URL)
+        cached = cache.load()
         try:
-            response = requests.get(GITHUB_API_URL)
-            response.raise_for_status()
-            releases = response.json()
-            
-            versions = []
-            for release in releases:
-                # Get Windows asset
-                windows_asset = next(
-                    (asset for asset in release["assets"] 
-                     if "windows" in asset["name"].lower()),
-                    None
-                )
-                
-                if windows_asset:
-                    # Parse date
-                    date_str = release["published_at"].split("T")[0]
-                    date = datetime.strptime(date_str, "%Y-%m-%d")
-                    formatted_date = date.strftime("%B %d, %Y")
-                    
-                    version = VersionInfo(
-                        version=release["tag_name"],
-                        date=formatted_date,
-                        description=release["body"],
-                        download_url=windows_asset["browser_download_url"]
-                    )
-                    versions.append(version)
-            
-            self.versions_loaded.emit(versions)
+            if cached:
+                # Show the cached catalog right away, then revalidate it
+                self.versions_loaded.emit(installable(cached))
+                if cache.fresh:
+                    return
+                versions = cache.refresh()
+                if versions is not None:
+                    self.versions_loaded.emit(installable(versions))
+            else:
+                # Nothing to show yet, fill the list page by page, then sort it
+                versions = cache.refresh(on_page=on_page)
+                self.versions_loaded.emit(installable(versions or []))
         except Exception as e:
-            self.error.emit(str(e))
+            if cached:
+                print(f"Error: release catalog could not be revalidated: {e}")
+            else:
+                self.error.emit(str(e))
 
 class WelcomePage(QWizardPage):
     def __init__(self):
@@ -272,33 +321,24 @@ class InstallationPage(QWizardPage):
         self.progress = QProgressBar()
         self.status = QLabel("Starting installation...")
         self.status.setWordWrap(True)
+        self.speed = QLabel()
 
         layout.addWidget(self.status)
         layout.addWidget(self.progress)
+        layout.addWidget(self.speed)
         self.setLayout(layout)
+        self.install_thread = None
+        self.installed = False
+        self.step_errors = []
 
-    def setup_registry_entries(self):
-        """Setup Windows registry entries for Control Panel"""
-        try:
-            # Registry path for installed programs
-            reg_path = r"Software\Microsoft\Windows\CurrentVersion\Uninstall\JuleLang"
-            
-            # Create registry key
-            key = winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER, reg_path, 0, winreg.KEY_WRITE)
-            
-            # Set registry values
-            winreg.SetValueEx(key, "DisplayName", 0, winreg.REG_SZ, "Jule Programming Language")
-            winreg.SetValueEx(key, "DisplayVersion", 0, winreg.REG_SZ, "1.0.0")
-            winreg.SetValueEx(key, "Publisher", 0, winreg.REG_SZ, "Jule Development Team")
-            winreg.SetValueEx(key, "InstallLocation", 0, winreg.REG_SZ, self.install_path)
-            winreg.SetValueEx(key, "DisplayIcon", 0, winreg.REG_SZ, os.path.join(self.install_path, "logo.png"))
-            
-            # Close registry key
-            winreg.CloseKey(key)
-        except Exception as e:
-            self.show_error(f"Failed to create registry entries: {str(e)}")
+    def isComplete(self):
+        # Next stays disabled until the engine is done, and after a failure
+        return self.installed
 
     def initializePage(self):
+        self.installed = False
+        self.step_errors = []
+        self.completeChanged.emit()
         self.install_path = self.field("install_path")
         self.add_to_path = self.field("add_to_path")
         
@@ -308,119 +348,45 @@ class InstallationPage(QWizardPage):
             self.show_error("Download URL not found!")
             return
         
-        self.status.setText("Downloading...")
-        self.download_thread = DownloadThread(
+        # Each release goes into its own directory under install_path
+        version = self.wizard().version_page.selected_version()
+
+        # Everything from download to cleanup runs in the background
+        self.install_thread = InstallThread(
             download_url,
-            os.path.join(self.install_path, "jule.zip")
+            self.install_path,
+            self.add_to_path,
+            version=version.version if version else None
         )
-        self.download_thread.progress.connect(self.update_progress)
-        self.download_thread.finished.connect(self.extract_files)
-        self.download_thread.error.connect(self.show_error)
-        self.download_thread.start()
-
-    def update_progress(self, value):
+        self.install_thread.progress.connect(self.update_progress)
+        self.install_thread.status.connect(self.status.setText)
+        self.install_thread.error.connect(self.on_step_error)
+        self.install_thread.failed.connect(self.show_error)
+        self.install_thread.completed.connect(self.on_completed)
+        self.install_thread.start()
+
+    def on_completed(self):
+        self.installed = True
+        self.speed.clear()
+        self.completeChanged.emit()
+
+    def on_step_error(self, error_msg):
+        self.step_errors.append(error_msg)
+        self.show_error(error_msg)
+
+    def update_progress(self, value, bytes_per_second, eta):
         self.progress.setValue(value)
-        self.status.setText(f"Downloading... {value}%")
-
-    def cleanup_temp_files(self):
-        """Clean up temporary files after installation"""
-        try:
-            # Files to remove
-            files_to_remove = [
-                "jule_idle.py",
-                "jule_interpreter.py",
-                "logo.png"
-            ]
-            
-            for file in files_to_remove:
-                file_path = os.path.join(os.path.dirname(__file__), file)
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                    except Exception as e:
-                        print(f"Error: {file} could not be removed: {e}")
-        except Exception as e:
-            print(f"Error during cleanup: {e}")
-    
-    def extract_files(self, zip_path):
-        try:
-            self.status.setText("Extracting files...")
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(self.install_path)
-            
-            # Remove downloaded zip file
-            os.remove(zip_path)
-            
-            # Add to PATH (if requested)
-            if self.add_to_path:
-                self.add_to_system_path()
-            
-            # Setup registry entries
-            self.setup_registry_entries()
-            
-            # Create shortcuts
-            self.create_shortcuts()
-            
-            # Clean up temporary files
-            self.cleanup_temp_files()
-            
-            self.status.setText("Installation completed successfully!")
-            self.progress.setValue(100)
-        except Exception as e:
-            self.show_error(f"Error extracting files: {str(e)}")
-
-    def add_to_system_path(self):
-        try:
-            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, 
-                               "Environment", 
-                               0, 
-                               winreg.KEY_ALL_ACCESS)
-            
-            current_path = winreg.QueryValueEx(key, "Path")[0]
-            new_path = f"{current_path};{self.install_path}"
-            # Clean up temporary file if needed
-            if not hasattr(editor, "file_path") and os.path.exists(temp_file):
-                os.remove(temp_file)
-
-            winreg.SetValueEx(key, "Path", 0, winreg.REG_EXPAND_SZ, new_path)
-            winreg.CloseKey(key)
-        except Exception as e:
-            self.show_error(f"Error setting PATH: {str(e)}")
+        if bytes_per_second <= 0:
+            self.speed.clear()
+            return
+        text = f"{bytes_per_second / (1024 * 1024):.1f} MB/s"
+        if eta >= 0:
+            minutes, seconds = divmod(int(eta), 60)
+            text += f", about {minutes}:{seconds:02d} left"
+        self.speed.setText(text)
 
     def show_error(self, error_msg):
         self.status.setText(f"Error: {error_msg}")
-        
-    def create_shortcuts(self):
-        """Create desktop shortcuts for Jule"""
-        try:
-            # Create Jule Interpreter shortcut
-            jule_exe = os.path.join(self.install_path, "jule.exe")
-            if os.path.exists(jule_exe):
-                create_shortcut(
-                    jule_exe,
-                    "Jule Interpreter",
-                    icon_path=jule_exe,
-                    description="Jule Programming Language Interpreter"
-                )
-            
-            # Copy the interpreter and IDLE Python files
-            self.copy_interpreter_files()
-            
-            # Create IDLE Jule shortcut
-            idle_script = os.path.join(self.install_path, "jule_idle.py")
-            if os.path.exists(idle_script):
-                create_shortcut(
-                    sys.executable,
-                    "IDLE Jule",
-                    arguments=f'"{idle_script}"',
-                    icon_path=get_resource_path("logo.png"),
-                    description="Jule Integrated Development Environment"
-                )
-        except Exception as e:
-            self.show_error(f"Failed to create shortcuts: {str(e)}")
-    
-
-    
 
 class CompletionPage(QWizardPage):
     def __init__(self):
@@ -428,16 +394,29 @@ class CompletionPage(QWizardPage):
         self.setTitle("Installation Complete")
         layout = QVBoxLayout()
         
-        info = QLabel(
+        self.info = QLabel()
+        self.info.setWordWrap(True)
+        layout.addWidget(self.info)
+        self.setLayout(layout)
+
+    def initializePage(self):
+        errors = self.wizard().installation_page.step_errors
+        if errors:
+            self.setTitle("Installation Completed with Errors")
+            self.info.setText(
+                "Jule has been installed, but some steps failed:\n\n" +
+                "\n".join(f"- {error}" for error in errors) +
+                "\n\nClick Finish to close the installer."
+            )
+            return
+        self.setTitle("Installation Complete")
+        self.info.setText(
             "Jule has been successfully installed!\n\n"
             "System PATH has been updated. You may need to restart your "
             "terminal windows for the changes to take effect.\n\n"
             "Shortcuts for Jule Interpreter and IDLE Jule have been created on your desktop.\n\n"
             "Click Finish to complete the installation."
         )
-        info.setWordWrap(True)
-        layout.addWidget(info)
-        self.setLayout(layout)
 
 class JuleInstaller(QWizard):
     def __init__(self):
@@ -445,10 +424,12 @@ class JuleInstaller(QWizard):
         self.setWindowTitle("Jule Setup")
         self.setWizardStyle(QWizard.ModernStyle)
 
+        self.version_page = VersionSelectionPage()
         self.addPage(WelcomePage())
-        self.addPage(VersionSelectionPage())
+        self.addPage(self.version_page)
+        self.installation_page = InstallationPage()
         self.addPage(InstallationPathPage())
-        self.addPage(InstallationPage())
+        self.addPage(self.installation_page)
         self.addPage(CompletionPage())
 
         self.setMinimumWidth(800)
@@ -456,7 +437,7 @@ class JuleInstaller(QWizard):
 
 def main():
     # Check admin rights
-    if not is_admin():
+    if not is_admin() and not STARTUP_PROBE:
         # Restart as administrator
         try:
             if sys.argv[-1] != 'asadmin':
@@ -489,6 +470,13 @@ def main():
     
     installer.show()
     
+    if STARTUP_PROBE:
+        # Runs once the event loop has painted the first window
+        def report_first_paint():
+            print("first-paint", flush=True)
+            app.quit()
+        QTimer.singleShot(0, report_first_paint)
+    
     # Start application loop
     sys.exit(app.exec_())
 
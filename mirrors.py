@@ -0,0 +1,89 @@
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+from http_session import get_session
+
+MIRRORS_ENV = "JULE_MIRRORS"
+PROBE_BYTES = 256 * 1024  # Enough to tell a fast mirror from a slow one
+PROBE_SECONDS = 1.0  # A mirror this slow is measured on what arrived so far
+
+class MirrorProbe:
+    def __init__(self, url, size=0, latency=0, bytes_per_second=0, error=None):
+        self.url = url
+        self.size = size
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.error = error
+
+    def expected_seconds(self, size):
+        """Estimated time to download size bytes from this mirror"""
+        return self.latency + size / max(self.bytes_per_second, 1)
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 1),
+            "mb_per_second": round(self.bytes_per_second / 1e6, 2),
+            "error": self.error
+        }
+
+def configured_mirrors():
+    """Mirror base URLs from JULE_MIRRORS, separated by commas or spaces"""
+    return os.environ.get(MIRRORS_ENV, "").replace(",", " ").split()
+
+def mirror_url(base, url):
+    """Where base mirrors url, laid out as <base>/<tag>/<asset> like GitHub's releases/download"""
+    parts = [part for part in urlparse(url).path.split("/") if part]
+    tag_and_asset = "/".join(parts[-2:])
+    return f"{base.rstrip('/')}/{tag_and_asset}"
+
+def probe_mirror(url):
+    """Time the first PROBE_BYTES of url, the response headers give latency and size"""
+    start = time.perf_counter()
+    try:
+        headers = {"Range": f"bytes=0-{PROBE_BYTES - 1}"}
+        with get_session().get(url, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            latency = time.perf_counter() - start
+            content_range = response.headers.get("content-range", "")
+            if response.status_code == 206 and "/" in content_range:
+                size = int(content_range.rsplit("/", 1)[1])
+            else:
+                size = int(response.headers.get("content-length", 0))
+
+            received = 0
+            # Stop early when a server ignores the range and sends everything
+            for chunk in response.iter_content(64 * 1024):
+                received += len(chunk)
+                if received >= PROBE_BYTES or time.perf_counter() - start > PROBE_SECONDS:
+                    break
+            elapsed = time.perf_counter() - start - latency
+    except (requests.RequestException, ValueError) as e:
+        return MirrorProbe(url, error=str(e))
+    return MirrorProbe(url, size, latency, received / max(elapsed, 1e-6))
+
+def rank_mirrors(urls):
+    """Probe urls concurrently, returning the working probes with the fastest expected download first.
+
+    Mirrors serving a different size than the first URL, or than most
+    mirrors when the first URL is down, are left out.
+    """
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        probes = list(executor.map(probe_mirror, urls))
+    for probe in probes:
+        if probe.error:
+            print(f"Error: mirror {probe.url} is unavailable: {probe.error}")
+    working = [probe for probe in probes if not probe.error and probe.size]
+    if not working:
+        return []
+    if working[0].url == urls[0]:
+        size = working[0].size
+    else:
+        size = Counter(probe.size for probe in working).most_common(1)[0][0]
+    working = [probe for probe in working if probe.size == size]
+    return sorted(working, key=lambda probe: probe.expected_seconds(size))
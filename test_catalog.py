@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from catalog import CatalogCache, CACHE_FORMAT, host_platform
+from engine import resolve_version
+from http_session import configure, get_session
+from test_support import ReleaseServerTestCase
+
+class CatalogCacheTest(ReleaseServerTestCase):
+    def setUp(self):
+        super().setUp()
+        archive = os.path.join(self.work_dir, "release.zip")
+        with open(archive, 'wb') as f:
+            f.write(b"jule")
+        # More than one page of PER_PAGE releases
+        self.server = self.start_server(archive, releases=150)
+        self.path = os.path.join(self.work_dir, "releases.json")
+
+    def cache(self, url=None, path=None):
+        return CatalogCache(url or self.server.api_url, path=path or self.path)
+
+    def requests_made(self):
+        return get_session().stats.requests
+
+    def test_cold_refresh_fetches_every_page(self):
+        cache = self.cache()
+        self.assertIsNone(cache.load())
+        pages = []
+        versions = cache.refresh(on_page=pages.append)
+
+        self.assertEqual(len(versions), 150)
+        self.assertEqual([len(page) for page in pages], [100, 50])
+        self.assertEqual(versions[0].version, "bench0.150")
+        self.assertEqual(cache.etag, self.server.releases_etag)
+        self.assertTrue(cache.fresh)
+        self.assertEqual(len(self.cache().load()), 150)
+
+    def test_not_modified_keeps_versions(self):
+        self.cache().refresh()
+        cache = self.cache()
+        cached = cache.load()
+        cache.fetched_at = 0
+
+        before = self.requests_made()
+        self.assertIsNone(cache.refresh())
+        # Only the first page is asked for, and answered with 304
+        self.assertEqual(self.requests_made(), before + 1)
+        self.assertIs(cache.versions, cached)
+        self.assertAlmostEqual(cache.fetched_at, time.time(), delta=5)
+        # The new fetched_at is saved for the next start
+        reloaded = self.cache()
+        reloaded.load()
+        self.assertTrue(reloaded.fresh)
+
+    def test_fresh_cache_makes_no_request(self):
+        with mock.patch.dict(os.environ, {"LOCALAPPDATA": self.work_dir}):
+            resolve_version("latest", self.server.api_url)
+            before = self.requests_made()
+            info = resolve_version("bench0.42", self.server.api_url)
+
+        self.assertEqual(info.version, "bench0.42")
+        self.assertEqual(self.requests_made(), before)
+
+    def test_stale_cache_is_used_offline(self):
+        with mock.patch.dict(os.environ, {"LOCALAPPDATA": self.work_dir}):
+            resolve_version("latest", self.server.api_url)
+            cache = CatalogCache(self.server.api_url)
+            cache.load()
+            cache.fetched_at = 0
+            cache.save()
+
+            self.server.__exit__(None, None, None)
+            configure(retries=0)
+            self.addCleanup(configure)
+            info = resolve_version("bench0.42", self.server.api_url)
+            # Nothing cached to fall back to
+            os.remove(cache.path)
+            with self.assertRaises(requests.RequestException):
+                resolve_version("bench0.42", self.server.api_url)
+
+        self.assertEqual(info.version, "bench0.42")
+
+    def test_mismatched_cache_is_rejected(self):
+        self.cache().refresh()
+        self.assertIsNone(self.cache(url=self.server.api_url + "?other").load())
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        entry["format"] = CACHE_FORMAT - 1
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        self.assertIsNone(self.cache().load())
+
+class HostPlatformTest(unittest.TestCase):
+    def test_named_like_release_assets(self):
+        hosts = {
+            ("Windows", "AMD64"): ("windows", "amd64"),
+            ("Linux", "x86_64"): ("linux", "amd64"),
+            ("Linux", "aarch64"): ("linux", "arm64"),
+            ("Darwin", "arm64"): ("darwin", "arm64"),
+            ("Linux", "riscv64"): ("linux", None)
+        }
+        for (system, machine), expected in hosts.items():
+            with mock.patch("platform.system", return_value=system), \
+                    mock.patch("platform.machine", return_value=machine):
+                self.assertEqual(host_platform(), expected, (system, machine))
+
+if __name__ == "__main__":
+    unittest.main()
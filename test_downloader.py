@@ -0,0 +1,83 @@
+import os
+import hashlib
+import unittest
+
+from benchmark import ReleaseHandler
+from downloader import Downloader, MIN_SEGMENT_SIZE
+from test_support import ReleaseServerTestCase
+
+ARCHIVE_SIZE = 5 * MIN_SEGMENT_SIZE  # Large enough for four segments
+
+class ShiftedRangeHandler(ReleaseHandler):
+    """Answers every range request with a Content-Range one byte past the requested start"""
+
+    def send_header(self, keyword, value):
+        if keyword == "Content-Range":
+            first, rest = value[len("bytes "):].split("-", 1)
+            value = f"bytes {int(first) + 1}-{rest}"
+        super().send_header(keyword, value)
+
+class DownloaderTest(ReleaseServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.archive = os.path.join(self.work_dir, "release.zip")
+        self.data = os.urandom(ARCHIVE_SIZE)
+        with open(self.archive, 'wb') as f:
+            f.write(self.data)
+        self.destination = os.path.join(self.work_dir, "download.zip")
+
+    def serve(self, **options):
+        server = self.start_server(self.archive, releases=1, **options)
+        return server, server.releases[0]["assets"][0]["browser_download_url"]
+
+    def read_destination(self):
+        with open(self.destination, 'rb') as f:
+            return f.read()
+
+    def test_segmented_download(self):
+        server, url = self.serve()
+        downloader = Downloader(url, self.destination, segments=4)
+        downloader.download()
+
+        self.assertEqual(len(downloader.ranges), 4)
+        self.assertEqual(server.asset_requests, 4)
+        self.assertEqual(self.read_destination(), self.data)
+        self.assertEqual(downloader.sha256, hashlib.sha256(self.data).hexdigest())
+        self.assertFalse(os.path.exists(downloader.state_path))
+
+    def test_single_stream_without_ranges(self):
+        server, url = self.serve(ranges=False)
+        downloader = Downloader(url, self.destination, segments=4)
+        downloader.download()
+
+        self.assertEqual(downloader.ranges, [])
+        self.assertEqual(server.asset_requests, 1)
+        self.assertEqual(self.read_destination(), self.data)
+
+    def test_content_range_mismatch_fails(self):
+        server, url = self.serve()
+        server.RequestHandlerClass = ShiftedRangeHandler
+        downloader = Downloader(url, self.destination, segments=4)
+
+        with self.assertRaisesRegex(IOError, "Server sent bytes 1-"):
+            downloader.download()
+        self.assertIsNotNone(downloader.error)
+        self.assertFalse(downloader.finished)
+
+    def test_restarts_when_the_remote_changes(self):
+        server, url = self.serve()
+        changed = os.path.join(self.work_dir, "changed.zip")
+        data = os.urandom(ARCHIVE_SIZE)
+        with open(changed, 'wb') as f:
+            f.write(data)
+        self.change_after_probe(server, changed)
+        downloader = Downloader(url, self.destination, segments=4)
+        downloader.download()
+
+        # If-Range no longer matched, so the old partial data was dropped
+        self.assertEqual(self.read_destination(), data)
+        self.assertEqual(downloader.sha256, hashlib.sha256(data).hexdigest())
+        self.assertFalse(os.path.exists(downloader.state_path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import sys
+import shutil
+import unittest
+from unittest import mock
+
+from benchmark import make_archive
+from delta import read_manifest
+from downloader import ChecksumMismatch
+from engine import InstallEngine, PostInstallSteps, WindowsSteps, main, resolve_version
+from versions import PREVIOUS_SUFFIX, current_path, current_version, staging_path, version_path
+from test_support import ReleaseServerTestCase
+
+class RecordingSteps(PostInstallSteps):
+    """Stands in for the Windows integration and records which steps ran"""
+    calls = []
+
+    def add_to_system_path(self):
+        self.calls.append(("path", self.install_path))
+
+    def create_shortcuts(self):
+        self.calls.append(("shortcuts", self.install_path))
+
+class InstallEngineTest(ReleaseServerTestCase):
+    def setUp(self):
+        super().setUp()
+        archive = os.path.join(self.work_dir, "release.zip")
+        make_archive(archive, files=20, file_size=4096)
+        self.server = self.start_server(archive, releases=2)
+        # Catalog cache and artifact store go under LOCALAPPDATA
+        patcher = mock.patch.dict(os.environ, {"LOCALAPPDATA": os.path.join(self.work_dir, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.root = os.path.join(self.work_dir, "jule")
+        RecordingSteps.calls = []
+
+    def spans(self, engine):
+        return [event["name"] for event in engine.tracer.events]
+
+    def forget_downloads(self):
+        # Every tag serves the same archive, which the store would hand back
+        shutil.rmtree(os.path.join(self.work_dir, "cache", "jule-installer", "artifacts"))
+
+    def engine(self, version, **options):
+        info = resolve_version(version, self.server.api_url)
+        return InstallEngine(info.download_url, self.root, steps=RecordingSteps,
+                             api_url=self.server.api_url, version=info.version,
+                             mirrors=[], **options)
+
+    def test_versioned_install(self):
+        errors = []
+        self.engine("bench0.1", on_error=errors.append).run()
+
+        installed = version_path(self.root, "bench0.1")
+        self.assertEqual(current_version(self.root), "bench0.1")
+        self.assertIsNotNone(read_manifest(installed))
+        self.assertTrue(os.path.isfile(os.path.join(installed, "jule", "std", "pkg0", "file0.jule")))
+        self.assertFalse(os.path.exists(staging_path(installed)))
+        # PATH and shortcuts point at the link, not the version directory
+        self.assertEqual(RecordingSteps.calls, [("path", current_path(self.root)),
+                                                ("shortcuts", current_path(self.root))])
+        self.assertEqual(errors, [])
+
+    def test_failed_checksum_leaves_install_untouched(self):
+        self.engine("bench0.1").run()
+        engine = self.engine("bench0.2", sha256="0" * 64)
+
+        with self.assertRaises(ChecksumMismatch):
+            engine.run()
+        self.assertEqual(current_version(self.root), "bench0.1")
+        self.assertFalse(os.path.exists(version_path(self.root, "bench0.2")))
+        self.assertFalse(os.path.exists(engine.staging_path))
+        # The trace is written whether or not the install succeeded
+        self.assertTrue(os.path.isfile(engine.trace_path))
+
+    def test_delta_upgrade_seeds_from_current(self):
+        self.engine("bench0.1").run()
+        self.forget_downloads()
+        old = version_path(self.root, "bench0.1")
+        unchanged = os.path.join("jule", "std", "pkg0", "file0.jule")
+        # A wrong size makes the delta fetch this file again
+        damaged = os.path.join(old, "jule", "std", "pkg1", "file1.jule")
+        with open(damaged, 'wb') as f:
+            f.write(b"damaged")
+        engine = self.engine("bench0.2")
+        engine.run()
+
+        self.assertIn("seed", self.spans(engine))
+        self.assertIn("delta", self.spans(engine))
+        self.assertEqual(current_version(self.root), "bench0.2")
+        new = version_path(self.root, "bench0.2")
+        self.assertTrue(os.path.samefile(os.path.join(old, unchanged), os.path.join(new, unchanged)))
+        # The repaired file is a new one, the old version's file was not written through the link
+        with open(damaged, 'rb') as f:
+            self.assertEqual(f.read(), b"damaged")
+        self.assertEqual(os.path.getsize(os.path.join(new, "jule", "std", "pkg1", "file1.jule")), 4096)
+
+    def test_no_seed_copy_without_ranges(self):
+        self.engine("bench0.1").run()
+        self.forget_downloads()
+        self.server.ranges = False
+        engine = self.engine("bench0.2")
+        engine.run()
+
+        # The probe rules the delta out before the current version is copied
+        self.assertNotIn("seed", self.spans(engine))
+        self.assertIn("download_and_extract", self.spans(engine))
+        self.assertEqual(current_version(self.root), "bench0.2")
+
+    def test_rollback_flat_install(self):
+        url = resolve_version("bench0.1", self.server.api_url).download_url
+        for _ in range(2):
+            InstallEngine(url, self.root, steps=RecordingSteps, api_url=self.server.api_url,
+                          mirrors=[]).run()
+        marker = os.path.join(self.root, "marker")
+        open(marker, 'w').close()
+
+        self.assertEqual(main(["--rollback", "--path", self.root]), 0)
+        self.assertFalse(os.path.exists(marker))
+        self.assertTrue(os.path.exists(os.path.join(self.root + PREVIOUS_SUFFIX, "marker")))
+
+class WindowsStepsTest(ReleaseServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.install_path = os.path.join(self.work_dir, "jule")
+        os.makedirs(self.install_path)
+        for name in ("jule.exe", "jule_idle.py"):
+            open(os.path.join(self.install_path, name), 'w').close()
+        self.winreg = mock.MagicMock()
+        self.winreg.QueryValueEx.return_value = ("C:\\bin", self.winreg.REG_EXPAND_SZ)
+        self.shortcut = mock.MagicMock()
+        # Neither module can be imported off Windows
+        patcher = mock.patch.dict(sys.modules, {"winreg": self.winreg, "shortcut": self.shortcut})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Cleanup removes the unpacked files beside the installer, not this checkout
+        self.unpacked = os.path.join(self.work_dir, "unpacked")
+        os.makedirs(self.unpacked)
+        open(os.path.join(self.unpacked, "logo.png"), 'w').close()
+        patcher = mock.patch("engine.__file__", os.path.join(self.unpacked, "engine.py"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_every_step_runs_without_errors(self):
+        errors = []
+        steps = WindowsSteps(self.install_path, errors.append)
+        steps.add_to_system_path()
+        steps.setup_registry_entries()
+        steps.create_shortcuts()
+        steps.cleanup_temp_files()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.shortcut.create_shortcut.call_count, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.unpacked, "logo.png")))
+        self.winreg.SetValueEx.assert_any_call(self.winreg.OpenKey.return_value, "Path", 0,
+                                               self.winreg.REG_EXPAND_SZ,
+                                               f"C:\\bin;{self.install_path}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import hashlib
+import zipfile
+import threading
+import unittest
+
+from benchmark import ReleaseHandler
+from extractor import PipelinedExtractor
+from test_support import ReleaseServerTestCase
+
+MEMBERS = 40
+MEMBER_SIZE = 64 * 1024
+
+class CorruptingWriter:
+    """Passes a response body through, flipping the byte at offset"""
+
+    def __init__(self, wfile, offset):
+        self.wfile = wfile
+        self.offset = offset
+
+    def write(self, data):
+        if 0 <= self.offset < len(data):
+            data = bytearray(data)
+            data[self.offset] ^= 0xFF
+        self.offset -= len(data)
+        return self.wfile.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.wfile, name)
+
+class CorruptOnceHandler(ReleaseHandler):
+    """Corrupts server.corrupt_at in the first response that covers it, later ones are intact"""
+
+    def send_asset(self, head):
+        self.corrupt = None
+        requested = self.headers.get("Range")
+        start, end = 0, len(self.server.archive) - 1
+        if requested:
+            first, last = requested[len("bytes="):].split("-")
+            start, end = int(first), int(last) if last else end
+        with self.server.corrupt_lock:
+            if not head and self.server.corrupt_at is not None and start <= self.server.corrupt_at <= end:
+                self.corrupt = self.server.corrupt_at - start
+                self.server.corrupt_at = None
+        super().send_asset(head)
+
+    def end_headers(self):
+        super().end_headers()
+        if getattr(self, "corrupt", None) is not None:
+            self.wfile = CorruptingWriter(self.wfile, self.corrupt)
+
+class PipelinedExtractorTest(ReleaseServerTestCase):
+    def setUp(self):
+        super().setUp()
+        archive = os.path.join(self.work_dir, "release.zip")
+        self.files = {f"jule/file{i}.bin": os.urandom(MEMBER_SIZE) for i in range(MEMBERS)}
+        # Stored, so a flipped byte fails the CRC rather than decompression
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zip_ref:
+            for name, data in self.files.items():
+                zip_ref.writestr(name, data)
+        with zipfile.ZipFile(archive, 'r') as zip_ref:
+            info = zip_ref.getinfo("jule/file5.bin")
+        # Inside the member's data, past its local header
+        self.corrupt_at = info.header_offset + 30 + len(info.filename) + MEMBER_SIZE // 2
+        with open(archive, 'rb') as f:
+            self.sha256 = hashlib.sha256(f.read()).hexdigest()
+
+        self.server = self.start_server(archive, releases=1)
+        self.server.RequestHandlerClass = CorruptOnceHandler
+        self.server.corrupt_at = self.corrupt_at
+        self.server.corrupt_lock = threading.Lock()
+        self.url = self.server.releases[0]["assets"][0]["browser_download_url"]
+        self.extract_to = os.path.join(self.work_dir, "staging")
+
+    def test_bad_member_is_downloaded_again(self):
+        pipeline = PipelinedExtractor(self.url, os.path.join(self.work_dir, "download.zip"),
+                                      self.extract_to, segments=4, sha256=self.sha256)
+        pipeline.run()
+
+        self.assertIsNone(self.server.corrupt_at)
+        # Only the damaged member's span was fetched again
+        repaired = pipeline.downloader.repaired_bytes
+        self.assertGreater(repaired, MEMBER_SIZE)
+        self.assertLess(repaired, 2 * MEMBER_SIZE)
+        self.assertEqual(pipeline.sha256, self.sha256)
+        for name, data in self.files.items():
+            with open(os.path.join(self.extract_to, name), 'rb') as f:
+                self.assertEqual(f.read(), data, name)
+
+    def test_starts_over_when_the_archive_changes(self):
+        self.server.corrupt_at = None
+        changed = os.path.join(self.work_dir, "changed.zip")
+        files = {f"jule/new{i}.bin": os.urandom(MEMBER_SIZE) for i in range(MEMBERS)}
+        with zipfile.ZipFile(changed, 'w', zipfile.ZIP_STORED) as zip_ref:
+            for name, data in files.items():
+                zip_ref.writestr(name, data)
+        self.change_after_probe(self.server, changed)
+        pipeline = PipelinedExtractor(self.url, os.path.join(self.work_dir, "download.zip"),
+                                      self.extract_to, segments=4)
+        pipeline.run()
+
+        # Only the new archive's members are left in the target
+        names = {os.path.relpath(os.path.join(root, name), self.extract_to).replace(os.sep, "/")
+                 for root, _, names in os.walk(self.extract_to) for name in names}
+        self.assertEqual(names, set(files))
+        self.assertEqual(pipeline.sha256, self.server.sha256)
+
+if __name__ == "__main__":
+    unittest.main()
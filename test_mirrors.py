@@ -0,0 +1,49 @@
+import os
+import hashlib
+import unittest
+
+from downloader import Downloader
+from mirrors import PROBE_BYTES, mirror_url, rank_mirrors
+from test_support import ReleaseServerTestCase
+
+ARCHIVE_SIZE = 16 * PROBE_BYTES
+
+class MirrorTest(ReleaseServerTestCase):
+    def setUp(self):
+        super().setUp()
+        archive = os.path.join(self.work_dir, "release.zip")
+        self.data = os.urandom(ARCHIVE_SIZE)
+        with open(archive, 'wb') as f:
+            f.write(self.data)
+        # The primary is throttled, the fastest mirror drops every response
+        # once the probe is through and the last one is slower but healthy
+        self.slow = self.start_server(archive, releases=1, bandwidth=2e6)
+        self.cut = self.start_server(archive, releases=1, cut_after=2 * PROBE_BYTES)
+        self.healthy = self.start_server(archive, releases=1, bandwidth=20e6)
+        self.url = self.slow.releases[0]["assets"][0]["browser_download_url"]
+        self.urls = [self.url] + [mirror_url(server.base_url + "/assets", self.url)
+                                  for server in (self.cut, self.healthy)]
+
+    def test_ranked_fastest_first(self):
+        probes = rank_mirrors(self.urls)
+
+        self.assertEqual([probe.url for probe in probes],
+                         [self.urls[1], self.urls[2], self.urls[0]])
+        self.assertTrue(all(probe.size == ARCHIVE_SIZE for probe in probes))
+
+    def test_fails_over_when_a_mirror_breaks_off(self):
+        probes = rank_mirrors(self.urls)
+        downloader = Downloader(self.url, os.path.join(self.work_dir, "download.zip"),
+                                segments=2, sha256=self.slow.sha256,
+                                mirrors=[probe.url for probe in probes])
+        downloader.download()
+
+        # Started on the cut mirror, beyond its probe, and finished on the healthy one
+        self.assertGreater(self.cut.asset_requests, 1)
+        self.assertTrue(downloader.current_url.startswith(self.healthy.base_url))
+        self.assertEqual(downloader.sha256, hashlib.sha256(self.data).hexdigest())
+        with open(downloader.destination, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+if __name__ == "__main__":
+    unittest.main()
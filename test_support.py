@@ -0,0 +1,40 @@
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+
+from benchmark import ReleaseHandler, ReleaseServer
+
+class ChangeAfterProbeHandler(ReleaseHandler):
+    """Publishes server.next_archive once the first HEAD was answered, like a re-uploaded asset"""
+
+    def do_HEAD(self):
+        super().do_HEAD()
+        server = self.server
+        with server.change_lock:
+            if server.next_archive is not None:
+                server.archive = server.next_archive
+                server.sha256 = hashlib.sha256(server.archive).hexdigest()
+                server.archive_etag = f'"{server.sha256[:16]}"'
+                server.next_archive = None
+
+class ReleaseServerTestCase(unittest.TestCase):
+    """Gives every test a scratch work_dir and starts local stand-in release servers"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="jule-test-")
+        self.addCleanup(shutil.rmtree, self.work_dir, True)
+
+    def start_server(self, archive_path, **options):
+        """Start a ReleaseServer for archive_path, stopped when the test ends"""
+        server = ReleaseServer(archive_path, **options).__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        return server
+
+    def change_after_probe(self, server, archive_path):
+        """Have server switch to the archive at archive_path right after the next probe"""
+        with open(archive_path, 'rb') as f:
+            server.next_archive = f.read()
+        server.change_lock = threading.Lock()
+        server.RequestHandlerClass = ChangeAfterProbeHandler
@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+TRACE_NAME = "jule-install-trace.json"
+
+class Tracer:
+    """Timed spans of an install, written in Chrome trace-event format.
+
+    The file opens in chrome://tracing or https://ui.perfetto.dev. Spans
+    are grouped into tracks by thread name, or by the track given to add(),
+    so a download overlapping extraction shows up as two parallel bars.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._origin = time.perf_counter()
+        self._tracks = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **args):
+        """Time the block as one span, the yielded dict becomes the span's args"""
+        start = time.perf_counter()
+        try:
+            yield args
+        except Exception as e:
+            args["error"] = str(e)
+            raise
+        finally:
+            self.add(name, start, time.perf_counter(), **args)
+
+    def add(self, name, start, end, track=None, **args):
+        """Record a span from perf_counter() values, on its own named track if given"""
+        self._record({
+            "name": name,
+            "cat": "install",
+            "ph": "X",
+            "ts": self._micros(start),
+            "dur": round((end - start) * 1e6),
+            "args": args
+        }, track)
+
+    def instant(self, name, **args):
+        self._record({
+            "name": name,
+            "cat": "install",
+            "ph": "i",
+            "s": "p",
+            "ts": self._micros(time.perf_counter()),
+            "args": args
+        })
+
+    def summary(self):
+        """Seconds spent in each span name"""
+        totals = {}
+        for event in self.events:
+            if event["ph"] == "X":
+                totals[event["name"]] = totals.get(event["name"], 0) + event["dur"] / 1e6
+        return totals
+
+    def write(self, path):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._lock:
+                trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(trace, f, indent=1)
+        except OSError as e:
+            print(f"Error: install trace could not be written: {e}")
+
+    def _micros(self, moment):
+        return round((moment - self._origin) * 1e6)
+
+    def _record(self, event, track=None):
+        track = track or threading.current_thread().name
+        event["pid"] = os.getpid()
+        with self._lock:
+            if track not in self._tracks:
+                self._tracks[track] = len(self._tracks) + 1
+                # Names the track in the viewer
+                self.events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": event["pid"],
+                    "tid": self._tracks[track],
+                    "args": {"name": track}
+                })
+            event["tid"] = self._tracks[track]
+            self.events.append(event)
@@ -0,0 +1,148 @@
+import os
+import sys
+import shutil
+
+from delta import read_manifest
+from extractor import member_target
+
+VERSIONS_DIR = "versions"
+CURRENT_LINK = "current"
+PREVIOUS_LINK = "previous"  # The version current pointed at before the last switch
+STAGING_SUFFIX = ".staging"
+PREVIOUS_SUFFIX = ".previous"
+
+def version_path(root, tag):
+    """Return where release tag is installed under root"""
+    if not tag or tag in (".", "..") or any(sep in tag for sep in "/\\:"):
+        raise ValueError(f"Invalid version tag: {tag}")
+    return os.path.join(root, VERSIONS_DIR, tag)
+
+def current_path(root):
+    """The stable location PATH and shortcuts point at"""
+    return os.path.join(root, CURRENT_LINK)
+
+def is_installed(root, tag):
+    # The manifest is written last, so a half finished install doesn't count
+    return read_manifest(version_path(root, tag)) is not None
+
+def _link_version(link):
+    try:
+        target = os.readlink(link)
+    except OSError:
+        return None
+    return os.path.basename(os.path.normpath(target))
+
+def current_version(root):
+    """Return the tag current points at, or None"""
+    return _link_version(current_path(root))
+
+def previous_version(root):
+    """Return the tag a rollback would switch back to, or None"""
+    return _link_version(os.path.join(root, PREVIOUS_LINK))
+
+def staging_path(path):
+    """Where a new tree for path is assembled, beside it so moving it in is a rename"""
+    return path + STAGING_SUFFIX
+
+def verify_tree(path):
+    """Raise IOError unless every file in the manifest under path is there at its recorded size"""
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise IOError(f"{path} has no install manifest")
+    bad = []
+    for name, (crc, size) in manifest["files"].items():
+        try:
+            if os.path.getsize(member_target(path, name)) != size:
+                bad.append(name)
+        except OSError:
+            bad.append(name)
+    if bad:
+        raise IOError(f"{len(bad)} files missing or incomplete in {path}, first {bad[0]}")
+
+def commit_staged(path):
+    """Move staging_path(path) into path, keeping a tree it replaces at path.previous.
+
+    Nothing else of the old tree is touched, so a failure before this
+    leaves it working; path is only missing between two renames.
+    """
+    staged = staging_path(path)
+    previous = path + PREVIOUS_SUFFIX
+    if os.path.lexists(previous):
+        shutil.rmtree(previous)
+    if os.path.lexists(path):
+        os.rename(path, previous)
+    try:
+        os.rename(staged, path)
+    except OSError:
+        if os.path.lexists(previous):
+            os.rename(previous, path)
+        raise
+
+def rollback_tree(path):
+    """Swap path with the tree commit_staged() kept at path.previous"""
+    previous = path + PREVIOUS_SUFFIX
+    if not os.path.isdir(previous):
+        raise FileNotFoundError(f"No previous install of {path} to roll back to")
+    if not os.path.lexists(path):
+        os.rename(previous, path)
+        return
+    swap = f"{path}.{os.getpid()}.swap"
+    os.rename(path, swap)
+    os.rename(previous, path)
+    os.rename(swap, previous)
+
+def _remove_link(path):
+    # Junctions are removed like empty directories, the target is left alone
+    if sys.platform == "win32":
+        os.rmdir(path)
+    else:
+        os.remove(path)
+
+def _replace_link(link, target):
+    """Point link at target, relative to the link's directory, replacing any existing link"""
+    temp_link = f"{link}.{os.getpid()}.tmp"
+    if os.path.lexists(temp_link):
+        _remove_link(temp_link)
+
+    if sys.platform == "win32":
+        import _winapi
+        # Junctions need no privileges, unlike directory symlinks
+        _winapi.CreateJunction(os.path.abspath(os.path.join(os.path.dirname(link), target)),
+                               temp_link)
+        old_link = link + ".old"
+        if os.path.lexists(old_link):
+            _remove_link(old_link)
+        if os.path.lexists(link):
+            os.rename(link, old_link)
+        os.rename(temp_link, link)
+        if os.path.lexists(old_link):
+            _remove_link(old_link)
+    else:
+        # Relative, so the whole root can be moved
+        os.symlink(target, temp_link, target_is_directory=True)
+        os.replace(temp_link, link)
+
+def switch_version(root, tag):
+    """Point current at an installed version without touching the files of any version.
+
+    On Linux the new symlink replaces the old one in a single rename. Windows
+    can't rename over a directory, so the old junction is moved aside first
+    and current is missing for the time between two renames. The version
+    current pointed at before is remembered for rollback().
+    """
+    target = version_path(root, tag)
+    if not os.path.isdir(target):
+        raise FileNotFoundError(f"Jule {tag} is not installed in {root}")
+
+    active = current_version(root)
+    if active and active != tag and os.path.isdir(version_path(root, active)):
+        _replace_link(os.path.join(root, PREVIOUS_LINK), os.path.join(VERSIONS_DIR, active))
+    _replace_link(current_path(root), os.path.join(VERSIONS_DIR, tag))
+
+def rollback(root):
+    """Switch current back to the version it pointed at before the last switch, returning its tag"""
+    tag = previous_version(root)
+    if not tag or not is_installed(root, tag):
+        raise FileNotFoundError(f"No previous version to roll back to in {root}")
+    switch_version(root, tag)
+    return tag